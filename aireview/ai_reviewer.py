@@ -1,10 +1,12 @@
 """Module for handling AI review generation."""
 import click
 import asyncio
+import posixpath
 from dataclasses import dataclass
 from openai import AsyncOpenAI
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from .git_handler import FileChange
+from .tokens import EXPECTED_OUTPUT_TOKENS, TokenRateLimiter, get_token_counter
 
 @dataclass
 class Review:
@@ -12,35 +14,114 @@ class Review:
     filename: str
     content: str
 
+SYSTEM_PROMPT = "You are an experienced software engineer tasked with reviewing code changes."
+
+def group_by_directory(items: List[Tuple[str, str]],
+                       fan_in: int) -> List[List[Tuple[str, str]]]:
+    """Pack path-sorted items into groups of at most fan_in, splitting at directory boundaries."""
+    by_directory = {}
+    for path, content in sorted(items, key=lambda item: item[0]):
+        by_directory.setdefault(posixpath.dirname(path), []).append((path, content))
+
+    groups = []
+    current = []
+    for members in by_directory.values():
+        # Start a new group rather than splitting a directory that would fit whole
+        if current and len(current) + len(members) > fan_in:
+            groups.append(current)
+            current = []
+        for member in members:
+            current.append(member)
+            if len(current) == fan_in:
+                groups.append(current)
+                current = []
+    if current:
+        groups.append(current)
+    return groups
+
+def common_directory(paths: List[str]) -> str:
+    """Return the deepest directory containing all paths."""
+    try:
+        return posixpath.commonpath([posixpath.dirname(path) for path in paths])
+    except ValueError:
+        return ""
+
+def create_summary_prompt(items: List[Tuple[str, str]], project_context: str,
+                          overview: bool = False) -> str:
+    """Create the prompt for summarizing a group of reviews."""
+    sections = "\n\n".join(
+        f"### {path or '(repository root)'}\n\n{content}" for path, content in items
+    )
+    if overview:
+        instruction = ("Write a top-level overview of the code review below. Highlight the "
+                       "most important issues, cross-cutting concerns that span several "
+                       "files or directories, and any recurring patterns.")
+    else:
+        instruction = ("Summarize the code review feedback below. Keep concrete, "
+                       "actionable issues with the files they apply to, merge duplicate "
+                       "findings, and note patterns that repeat across files.")
+
+    return f"""{project_context}
+
+    {instruction}
+
+    {sections}"""
+
+def _progress(message: str, repo: Optional[str] = None):
+    """Echo a progress line, prefixed with the repository when reviewing a fleet."""
+    click.echo(f"[{repo}] {message}" if repo else message)
+
 class AIReviewer:
-    def __init__(self, model: str, api_key: str, base_url: Optional[str] = None):
-        self.client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=base_url if base_url else None
-        )
+    def __init__(self, model: str, api_key: str, base_url: Optional[str] = None,
+                 max_concurrency: int = 10, max_tokens_per_minute: int = 0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client: Optional[AsyncOpenAI] = None
         self.model = model
+        self.max_concurrency = max_concurrency
+        # Created lazily so it binds to the event loop that runs the reviews
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Limits the files with profile reviews in flight, see review_profiles
+        self._file_slots: Optional[asyncio.Semaphore] = None
+        # Shared by every request made through this reviewer, e.g. across a fleet
+        self._token_limiter: Optional[TokenRateLimiter] = None
+        self._count_tokens = None
+        if max_tokens_per_minute:
+            self._token_limiter = TokenRateLimiter(max_tokens_per_minute)
+            self._count_tokens, _ = get_token_counter(model)
     
+    @property
+    def client(self) -> AsyncOpenAI:
+        """The API client, created on first use so planning needs no credentials."""
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url if self.base_url else None
+            )
+        return self._client
+
     async def review_changes(self, changes: List[FileChange], 
-                           project_context: str, prompt_template: str) -> List[Review]:
-        """Generate AI reviews for all file changes in parallel."""
-        click.echo(f"Generating reviews for {len(changes)} files...")
+                           project_context: str, prompt_template: str,
+                           encoding: str = "verbose",
+                           repo: Optional[str] = None) -> List[Review]:
+        """Generate AI reviews for all file changes in parallel.
+
+        ``repo`` labels the progress output when several repositories are
+        reviewed at once.
+        """
+        changes = self._reviewable(changes, repo)
+        _progress(f"Generating reviews for {len(changes)} files...", repo)
         
         # Create tasks for all reviews
         tasks = []
         for change in changes:
-            click.echo(f"Starting review for {change.filename}...")
+            _progress(f"Starting review for {change.filename}...", repo)
             
             # Create prompt with filename included
-            prompt = self._create_prompt(
-                changes=change.content,
-                filename=change.filename,
-                file_content=change.file_content,
-                project_context=project_context,
-                prompt_template=prompt_template
-            )
+            prompt = self.build_prompt(change, project_context, prompt_template, encoding)
             
             # Create task for this review
-            tasks.append(self._get_review(prompt, change.filename))
+            tasks.append(self._get_review(prompt, change.filename, repo=repo))
         
         # Run all reviews concurrently
         review_contents = await asyncio.gather(*tasks)
@@ -53,6 +134,92 @@ class AIReviewer:
         
         return reviews
     
+    async def review_profiles(self, changes: List[FileChange], project_context: str,
+                              profiles: Dict[str, str],
+                              encoding: str = "verbose",
+                              repo: Optional[str] = None) -> Dict[str, List[Review]]:
+        """Review every file with every named prompt template.
+
+        Each file's prompts share a prefix the API can cache, so one profile
+        is sent first and the others follow once it has completed and the
+        prefix is cached. Files hold one of max_concurrency slots until all
+        their profiles are done, so the follow-ups only compete with the
+        other files in flight rather than queueing behind every first request.
+        """
+        changes = self._reviewable(changes, repo)
+        _progress(f"Generating reviews for {len(changes)} files with "
+                  f"{len(profiles)} profiles ({', '.join(profiles)})...", repo)
+        if self._file_slots is None:
+            self._file_slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def review_file(change: FileChange) -> List[str]:
+            requests = [
+                (name, self.build_profile_prompt(change, project_context, template, encoding))
+                for name, template in profiles.items()
+            ]
+            first_name, first_prompt = requests[0]
+            async with self._file_slots:
+                _progress(f"Starting review for {change.filename}...", repo)
+                first = await self._get_review(first_prompt, change.filename,
+                                               profile=first_name, repo=repo)
+                rest = await asyncio.gather(*[
+                    self._get_review(prompt, change.filename, profile=name, repo=repo)
+                    for name, prompt in requests[1:]
+                ])
+            return [first, *rest]
+
+        file_contents = await asyncio.gather(*[review_file(change) for change in changes])
+
+        reviews = {name: [] for name in profiles}
+        for change, contents in zip(changes, file_contents):
+            for name, content in zip(profiles, contents):
+                reviews[name].append(Review(filename=change.filename, content=content))
+        return reviews
+
+    @staticmethod
+    def _reviewable(changes: List[FileChange], repo: Optional[str] = None) -> List[FileChange]:
+        """Drop renames and mode changes that have no content to review."""
+        reviewable = []
+        for change in changes:
+            if change.hunks:
+                reviewable.append(change)
+            else:
+                _progress(f"Skipping {change.filename} ({change.status}, no content changes)", repo)
+        return reviewable
+
+    def build_profile_prompt(self, change: FileChange, project_context: str,
+                             prompt_template: str, encoding: str = "verbose") -> str:
+        """Build a profile review prompt with the profile's template last.
+
+        Everything before the template depends only on the file, so prompts
+        for the same file under different profiles start with the same text.
+        """
+        prefix = self.build_prompt(change, project_context, "", encoding)
+        return f"{prefix}\n\n{prompt_template}"
+
+    def build_prompt(self, change: FileChange, project_context: str,
+                     prompt_template: str, encoding: str = "verbose") -> str:
+        """Build the review prompt for a single file change.
+
+        The "compact" encoding sends a trimmed unified diff in a template
+        without indentation, which uses fewer tokens than "verbose".
+        """
+        if encoding == "compact":
+            return self._create_compact_prompt(
+                changes=change.compact_content,
+                filename=change.filename,
+                file_content=change.file_content,
+                project_context=project_context,
+                prompt_template=prompt_template
+            )
+        return self._create_prompt(
+            changes=change.content,
+            filename=change.filename,
+            file_content=change.file_content,
+            project_context=project_context,
+            prompt_template=prompt_template
+        )
+
     def _create_prompt(self, changes: str, filename: str,
                       file_content: Optional[str], project_context: str,
                       prompt_template: str) -> str:
@@ -77,20 +244,91 @@ class AIReviewer:
         ```
         {file_content_section}
         Please focus your review on these specific changes."""
+
+    def _create_compact_prompt(self, changes: str, filename: str,
+                               file_content: Optional[str], project_context: str,
+                               prompt_template: str) -> str:
+        """Create a compact prompt for a single file review."""
+        sections = [project_context, prompt_template,
+                    f"Review the following changes in {filename}:\n```diff\n{changes}\n```"]
+        if file_content:
+            sections.append(f"Current file content:\n```\n{file_content.rstrip()}\n```")
+        sections.append("Please focus your review on these specific changes.")
+        return "\n\n".join(section for section in sections if section)
     
-    async def _get_review(self, prompt: str, filename: str) -> str:
-        """Get AI review for the provided prompt."""
-        try:
+    async def summarize_reviews(self, reviews: List[Review], project_context: str,
+                                fan_in: int = 8, max_depth: int = 3,
+                                repo: Optional[str] = None) -> Review:
+        """Reduce per-file reviews into a single overview.
+
+        Reviews are grouped by directory into batches of at most ``fan_in``
+        and each batch is summarized concurrently. This repeats for up to
+        ``max_depth`` levels, then the remaining summaries are combined into
+        the top-level overview.
+        """
+        fan_in = max(2, fan_in)
+        items = [(review.filename, review.content) for review in reviews]
+
+        depth = 0
+        while len(items) > fan_in and depth < max_depth:
+            depth += 1
+            groups = group_by_directory(items, fan_in)
+            _progress(f"Summarizing {len(items)} reviews in {len(groups)} groups "
+                      f"(level {depth})...", repo)
+            summaries = await asyncio.gather(*[
+                self._summarize_group(group, project_context) for group in groups
+            ])
+            items = [
+                (common_directory([path for path, _ in group]), summary)
+                for group, summary in zip(groups, summaries)
+            ]
+
+        _progress("Generating overview...", repo)
+        overview = await self._complete(
+            create_summary_prompt(items, project_context, overview=True)
+        )
+        return Review(filename="", content=f"# Overview\n\n{overview}")
+
+    async def _summarize_group(self, group: List[Tuple[str, str]], project_context: str) -> str:
+        """Summarize one group of reviews."""
+        return await self._complete(create_summary_prompt(group, project_context))
+
+    async def _complete(self, prompt: str) -> str:
+        """Send a prompt to the model, respecting the concurrency and token limits."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        reserved = 0
+        if self._token_limiter is not None:
+            reserved = await self._token_limiter.acquire(
+                self._count_tokens(SYSTEM_PROMPT) + self._count_tokens(prompt)
+                + EXPECTED_OUTPUT_TOKENS
+            )
+
+        async with self._semaphore:
             completion = await self.client.chat.completions.create(
                 model=self.model,
                 n=1,
                 messages=[
-                    {"role": "system", "content": "You are an experienced software engineer tasked with reviewing code changes."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt},
                 ]
             )
+
+        if self._token_limiter is not None:
+            used = getattr(getattr(completion, "usage", None), "total_tokens", None)
+            if isinstance(used, int):
+                self._token_limiter.record(used - reserved)
+        return completion.choices[0].message.content
+
+    async def _get_review(self, prompt: str, filename: str, profile: Optional[str] = None,
+                          repo: Optional[str] = None) -> str:
+        """Get AI review for the provided prompt."""
+        label = f"{filename} ({profile})" if profile else filename
+        try:
+            content = await self._complete(prompt)
             
-            click.echo(f"Completed review for {filename}")
-            return f"## Review for changes in {filename}\n\n{completion.choices[0].message.content}"
+            _progress(f"Completed review for {label}", repo)
+            return f"## Review for changes in {filename}\n\n{content}"
         except Exception as e:
-            raise RuntimeError(f"OpenAI API error for {filename}: {str(e)}")
\ No newline at end of file
+            raise RuntimeError(f"OpenAI API error for {label}: {str(e)}")
\ No newline at end of file
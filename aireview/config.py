@@ -1,16 +1,24 @@
 """Module for handling configuration management."""
 import configparser
 import logging
-from dataclasses import dataclass
-from typing import Optional, Tuple, Union
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple, Union
 from typing_extensions import Literal
 
+PROMPT_ENCODINGS = ("verbose", "compact")
+
 @dataclass
 class AIConfig:
     """Configuration settings for AI service."""
     model: str
     api_key: str
     base_url: Optional[str] = None
+    max_concurrency: int = 10
+    # 0 leaves the number of tokens sent per minute unlimited
+    max_tokens_per_minute: int = 0
+    input_cost_per_million: float = 0.0
+    output_cost_per_million: float = 0.0
 
 @dataclass
 class ReviewConfig:
@@ -18,30 +26,70 @@ class ReviewConfig:
     output_file: str
     project_context: str
     prompt_template: str
+    prompt_encoding: str = "verbose"
+    summary: bool = False
+    summary_fan_in: int = 8
+    summary_depth: int = 3
+    # Named [prompt.<name>] templates, reviewed together in one run
+    profiles: Dict[str, str] = field(default_factory=dict)
 
 class ConfigLoader:
     def __init__(self, config_file: str = "aireview.config"):
         self.config_file = config_file
         self.config = configparser.ConfigParser()
         
-    def load(self) -> Tuple[AIConfig, ReviewConfig]:
-        """Load and validate configuration settings."""
+    def load(self, require_api_key: bool = True) -> Tuple[AIConfig, ReviewConfig]:
+        """Load and validate configuration settings.
+
+        The API key may be left out when nothing will be sent, e.g. for --plan.
+        """
         self.config.read(self.config_file)
         
         ai_config = AIConfig(
             model=self.config.get("ai", "model", fallback="gpt-4"),
             api_key=self.config.get("ai", "api_key", fallback=""),
-            base_url=self.config.get("ai", "base_url", fallback="")
+            base_url=self.config.get("ai", "base_url", fallback=""),
+            max_concurrency=self.config.getint("ai", "max_concurrency", fallback=10),
+            max_tokens_per_minute=self.config.getint("ai", "max_tokens_per_minute", fallback=0),
+            input_cost_per_million=self.config.getfloat("ai", "input_cost_per_million", fallback=0.0),
+            output_cost_per_million=self.config.getfloat("ai", "output_cost_per_million", fallback=0.0)
         )
         
-        if not ai_config.api_key:
+        if require_api_key and not ai_config.api_key:
             raise ValueError("API key is required in the configuration file.")
+        if ai_config.max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        if ai_config.max_tokens_per_minute < 0:
+            raise ValueError("max_tokens_per_minute must not be negative.")
             
         review_config = ReviewConfig(
             output_file=self.config.get("review", "output", fallback="ai-review.md"),
             project_context=self.config.get("context", "project_context", fallback=""),
             prompt_template=self.config.get("prompt", "prompt_template",
-                fallback="Please review these code changes and provide specific feedback...")
+                fallback="Please review these code changes and provide specific feedback..."),
+            prompt_encoding=self.config.get("prompt", "encoding", fallback="verbose"),
+            summary=self.config.getboolean("review", "summary", fallback=False),
+            summary_fan_in=self.config.getint("review", "summary_fan_in", fallback=8),
+            summary_depth=self.config.getint("review", "summary_depth", fallback=3),
+            profiles=self._load_profiles()
         )
         
-        return ai_config, review_config
\ No newline at end of file
+        if review_config.prompt_encoding not in PROMPT_ENCODINGS:
+            raise ValueError(f"Prompt encoding must be one of: {', '.join(PROMPT_ENCODINGS)}.")
+        
+        return ai_config, review_config
+    
+    def _load_profiles(self) -> Dict[str, str]:
+        """Load the prompt templates of all [prompt.<name>] sections."""
+        profiles = {}
+        for section in self.config.sections():
+            if not section.startswith("prompt."):
+                continue
+            name = section[len("prompt."):]
+            if not re.fullmatch(r"[\w-]+", name):
+                raise ValueError(f"Invalid prompt profile [{section}]: names may only contain "
+                                 "letters, digits, '_' and '-'.")
+            if not self.config.get(section, "prompt_template", fallback=""):
+                raise ValueError(f"Prompt profile '{name}' needs a prompt_template.")
+            profiles[name] = self.config.get(section, "prompt_template")
+        return profiles
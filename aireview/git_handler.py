@@ -1,25 +1,153 @@
 """Module for handling Git operations."""
 import subprocess
-from dataclasses import dataclass
-from typing import List, Optional, Dict
-import os
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+HUNK_HEADER = re.compile(r'@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+# Single-character escapes used by git when quoting paths
+GIT_ESCAPES = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r',
+               't': '\t', 'v': '\v', '"': '"', '\\': '\\'}
+# Runs of blank added/removed lines longer than this are collapsed in compact output
+BLANK_RUN_LIMIT = 2
+
+class Hunk:
+    """A single diff hunk, stored as offsets into the shared diff buffer."""
+    __slots__ = ('old_start', 'old_lines', 'new_start', 'new_lines', 'start', 'end')
+
+    def __init__(self, old_start: int, old_lines: int, new_start: int,
+                 new_lines: int, start: int, end: int):
+        self.old_start = old_start
+        self.old_lines = old_lines
+        self.new_start = new_start
+        self.new_lines = new_lines
+        # Offsets of the hunk body (the lines after the @@ header) in the diff
+        self.start = start
+        self.end = end
+
+    @property
+    def header(self) -> str:
+        """Return the unified diff header for this hunk."""
+        return (f"@@ -{self.old_start},{self.old_lines} "
+                f"+{self.new_start},{self.new_lines} @@")
+
+    def __repr__(self) -> str:
+        return f"Hunk({self.header}, start={self.start}, end={self.end})"
 
-@dataclass
 class FileChange:
-    """Represents changes in a single file."""
-    filename: str
-    content: str
-    file_content: Optional[str] = None
+    """Represents changes in a single file.
+
+    Hunks reference ranges of ``diff``, which is the full diff output shared by
+    every FileChange parsed from it, so per-file text is never copied.
+    """
+    __slots__ = ('old_path', 'new_path', 'status', 'hunks', 'diff', 'file_content')
+
+    ADDED = 'added'
+    DELETED = 'deleted'
+    MODIFIED = 'modified'
+    RENAMED = 'renamed'
+    MODE = 'mode'
+
+    def __init__(self, old_path: Optional[str], new_path: Optional[str],
+                 status: str = MODIFIED, hunks: Optional[List[Hunk]] = None,
+                 diff: str = "", file_content: Optional[str] = None):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.status = status
+        self.hunks = hunks if hunks is not None else []
+        self.diff = diff
+        self.file_content = file_content
+
+    @property
+    def filename(self) -> str:
+        """Full path of the file, falling back to the old path for deletions."""
+        return self.new_path if self.new_path is not None else self.old_path
+
+    def hunk_text(self, hunk: Hunk) -> str:
+        """Return the raw body of a hunk from the shared diff buffer."""
+        return self.diff[hunk.start:hunk.end]
+
+    @property
+    def content(self) -> str:
+        """Render the hunks as readable text for the review prompt."""
+        changes = []
+        for hunk in self.hunks:
+            changes.append(hunk.header)
+            for line in self.hunk_text(hunk).splitlines():
+                if line.startswith('+'):
+                    changes.append(f"Added: {line[1:]}")
+                elif line.startswith('-'):
+                    changes.append(f"Removed: {line[1:]}")
+        return "\n".join(changes)
+
+    @property
+    def compact_content(self) -> str:
+        """Render the hunks as a compact unified diff for the review prompt.
+
+        Trailing whitespace is trimmed, long runs of blank lines are collapsed
+        and hunks that only change whitespace are reduced to their header.
+        """
+        return "\n".join(
+            _compact_hunk(hunk.header, self.hunk_text(hunk)) for hunk in self.hunks
+        )
+
+    def __repr__(self) -> str:
+        return (f"FileChange(old_path={self.old_path!r}, new_path={self.new_path!r}, "
+                f"status={self.status!r}, hunks={self.hunks!r})")
+
+def _line_tokens(lines: List[str]) -> List[Tuple[str, List[str]]]:
+    """Split each non-blank line into its indentation and whitespace-separated tokens."""
+    return [
+        (line[:len(line) - len(line.lstrip())], line.split())
+        for line in lines if line.strip()
+    ]
+
+def _compact_hunk(header: str, body: str) -> str:
+    """Encode one hunk body as compact unified diff lines."""
+    lines = [line for line in body.splitlines() if line[:1] in ('+', '-', ' ')]
+    removed = [line[1:] for line in lines if line[0] == '-']
+    added = [line[1:] for line in lines if line[0] == '+']
+
+    # Compare indentation and tokens line by line, so re-indented lines, joined
+    # tokens or edited string literals still show
+    if _line_tokens(removed) == _line_tokens(added):
+        return f"{header} whitespace-only change (-{len(removed)} +{len(added)} lines)"
+
+    output = [header]
+    run_marker = None
+    run_length = 0
+
+    def flush_run():
+        if run_length > BLANK_RUN_LIMIT:
+            output.append(f"{run_marker} [{run_length} blank lines]")
+        else:
+            output.extend([run_marker] * run_length)
+
+    for line in lines:
+        marker, text = line[0], line[1:].rstrip()
+        if not text and marker == run_marker:
+            run_length += 1
+            continue
+        if run_length:
+            flush_run()
+        run_marker, run_length = (marker, 1) if not text else (None, 0)
+        if text:
+            output.append(marker + text)
+    if run_length:
+        flush_run()
+    return "\n".join(output)
 
 class GitHandler:
-    @staticmethod
-    def get_file_changes() -> List[FileChange]:
+    def __init__(self, repo_path: Optional[str] = None):
+        # Git commands run in repo_path, or the current directory when None
+        self.repo_path = repo_path
+
+    def get_file_changes(self) -> List[FileChange]:
         """Retrieves staged changes from Git and their corresponding file content efficiently."""
         try:
             # Get staged changes
             staged_cmd = subprocess.run(
                 ['git', 'diff', '--cached', '--unified=0'],
-                capture_output=True, text=True, check=True
+                capture_output=True, text=True, check=True, cwd=self.repo_path
             )
             
             if not staged_cmd.stdout:
@@ -28,59 +156,46 @@ class GitHandler:
             # Parse the diff output first
             changes = GitHandler._parse_diff_output(staged_cmd.stdout)
             
-            # Get the list of files we need content for
-            files_to_fetch = [change.filename for change in changes]
+            # Get the list of files we need content for, keyed by full path
+            files_to_fetch = [change.new_path for change in changes
+                              if change.new_path is not None and change.hunks]
             
             # Batch fetch file contents
-            file_contents = GitHandler._batch_get_file_contents(files_to_fetch)
+            file_contents = self._batch_get_file_contents(files_to_fetch)
             
             # Update FileChange objects with their content
             for change in changes:
-                change.file_content = file_contents.get(change.filename)
+                if change.new_path in file_contents:
+                    change.file_content = file_contents[change.new_path]
             
             return changes
             
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Git command failed: {e.stderr}")
     
-    @staticmethod
-    def _batch_get_file_contents(filenames: List[str]) -> Dict[str, Optional[str]]:
+    def _batch_get_file_contents(self, filenames: List[str]) -> Dict[str, Optional[str]]:
         """
         Efficiently get contents of multiple files using git cat-file --batch.
-        Returns a dictionary mapping filenames to their content.
+        Staged versions are requested as ':<path>' so a single git process
+        serves every file. Returns a dictionary mapping filenames to their content.
         """
         if not filenames:
             return {}
         
         try:
-            # Get object IDs for staged versions of files
-            file_revs = {}
-            for filename in filenames:
-                try:
-                    rev_cmd = subprocess.run(
-                        ['git', 'rev-parse', f':"{filename}"'],
-                        capture_output=True, text=True, check=True
-                    )
-                    file_revs[filename] = rev_cmd.stdout.strip()
-                except subprocess.CalledProcessError:
-                    # File might be new/deleted
-                    file_revs[filename] = None
-            
-            # Prepare batch input
-            valid_revs = {f: rev for f, rev in file_revs.items() if rev is not None}
-            if not valid_revs:
-                return {f: None for f in filenames}
-            
-            # Start git cat-file --batch process
+            # cat-file reads one object name per line, so such paths can't be batched
+            if any('\n' in filename for filename in filenames):
+                raise ValueError("Path contains a newline")
+
             process = subprocess.Popen(
                 ['git', 'cat-file', '--batch'],
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
+                stderr=subprocess.PIPE,
+                cwd=self.repo_path
             )
             
-            # Write object IDs to git cat-file
-            input_data = '\n'.join(valid_revs.values()) + '\n'
+            input_data = ''.join(f':{filename}\n' for filename in filenames)
             stdout, stderr = process.communicate(input_data.encode())
             
             if process.returncode != 0:
@@ -88,86 +203,157 @@ class GitHandler:
                     process.returncode, 'git cat-file', stderr
                 )
             
-            # Parse the output
+            # Objects come back in request order, each as '<oid> <type> <size>\n'
+            # followed by the content and a newline, or '<name> missing\n'
             contents = {}
-            current_content = []
-            current_file = None
-            rev_to_file = {rev: f for f, rev in valid_revs.items()}
-            
-            for line in stdout.decode().split('\n'):
-                if line.strip() and ' blob ' in line:
-                    # New blob header - save previous content if any
-                    if current_file and current_content:
-                        contents[current_file] = ''.join(current_content)
-                        current_content = []
-                    
-                    # Get filename for this blob
-                    obj_id = line.split()[0]
-                    current_file = rev_to_file.get(obj_id)
+            pos = 0
+            for filename in filenames:
+                header_end = stdout.index(b'\n', pos)
+                header = stdout[pos:header_end].split()
+                pos = header_end + 1
+                if len(header) != 3 or header[-1] in (b'missing', b'ambiguous'):
+                    # File might be new/deleted or not a blob
+                    contents[filename] = None
+                    continue
+                size = int(header[2])
+                if header[1] == b'blob':
+                    contents[filename] = stdout[pos:pos + size].decode('utf-8', errors='replace')
                 else:
-                    current_content.append(line + '\n')
-            
-            # Save last file's content
-            if current_file and current_content:
-                contents[current_file] = ''.join(current_content)
+                    contents[filename] = None
+                pos += size + 1
             
-            # Include None for files that weren't found
-            return {f: contents.get(f) for f in filenames}
+            return contents
             
-        except Exception as e:
+        except Exception:
             # If batch operation fails, fall back to individual git show commands
-            return GitHandler._fallback_get_file_contents(filenames)
+            return self._fallback_get_file_contents(filenames)
     
-    @staticmethod
-    def _fallback_get_file_contents(filenames: List[str]) -> Dict[str, Optional[str]]:
+    def _fallback_get_file_contents(self, filenames: List[str]) -> Dict[str, Optional[str]]:
         """Fallback method to get file contents using git show."""
         contents = {}
         for filename in filenames:
             try:
                 show_cmd = subprocess.run(
                     ['git', 'show', f':{filename}'],
-                    capture_output=True, text=True, check=True
+                    capture_output=True, text=True, check=True, cwd=self.repo_path
                 )
                 contents[filename] = show_cmd.stdout
             except subprocess.CalledProcessError:
                 contents[filename] = None
         return contents
     
+    @staticmethod
+    def _iter_lines(diff_output: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start, end) offsets of each line in the diff, excluding newlines."""
+        pos = 0
+        length = len(diff_output)
+        while pos < length:
+            end = diff_output.find('\n', pos)
+            if end == -1:
+                end = length
+            yield pos, end
+            pos = end + 1
+
     @staticmethod
     def _parse_diff_output(diff_output: str) -> List[FileChange]:
         """Parse git diff output into FileChange objects."""
         changes = []
-        diff_sections = diff_output.split('diff --git ')
-        
-        for section in diff_sections[1:]:  # Skip first empty section
-            if not section.strip():
-                continue
-                
-            filename = GitHandler._extract_filename(section)
-            if not filename:
+        current = None
+        hunk = None
+
+        def finish_file():
+            # Renames, mode changes and empty added/deleted files have no hunks
+            if current is not None and (current.hunks or current.status != FileChange.MODIFIED):
+                changes.append(current)
+
+        for start, end in GitHandler._iter_lines(diff_output):
+            if diff_output.startswith('diff --git ', start, end):
+                finish_file()
+                hunk = None
+                current = FileChange(*GitHandler._extract_git_paths(diff_output[start:end]),
+                                     diff=diff_output)
+            elif current is None:
                 continue
-                
-            change_content = GitHandler._extract_changes(section)
-            if change_content:
-                changes.append(FileChange(filename=filename, content=change_content))
-                
+            elif diff_output.startswith('@@', start, end):
+                header = HUNK_HEADER.match(diff_output, start, end)
+                if not header:
+                    continue
+                old_start, old_lines, new_start, new_lines = header.groups()
+                hunk = Hunk(
+                    old_start=int(old_start),
+                    old_lines=int(old_lines) if old_lines is not None else 1,
+                    new_start=int(new_start),
+                    new_lines=int(new_lines) if new_lines is not None else 1,
+                    start=min(end + 1, len(diff_output)),
+                    end=min(end + 1, len(diff_output)),
+                )
+                current.hunks.append(hunk)
+            elif hunk is not None:
+                if diff_output[start:start + 1] in ('+', '-', ' ', '\\'):
+                    hunk.end = min(end + 1, len(diff_output))
+            else:
+                GitHandler._apply_header_line(current, diff_output[start:end])
+
+        finish_file()
         return changes
-    
+
     @staticmethod
-    def _extract_filename(section: str) -> Optional[str]:
-        """Extract filename from diff section."""
-        for line in section.split('\n'):
-            if line.startswith('+++'):
-                return line.split('/')[-1].strip()
-        return None
-    
+    def _extract_git_paths(line: str) -> Tuple[Optional[str], Optional[str]]:
+        """Extract old and new paths from a 'diff --git a/... b/...' line."""
+        paths = line[len('diff --git '):]
+        if paths.startswith('"'):
+            old, _, new = paths[1:].partition('" ')
+            return GitHandler._unquote_path(f'"{old}"')[2:], GitHandler._unquote_path(new)[2:]
+        # Without quoting, the paths are only unambiguous when they are equal
+        half = (len(paths) - 1) // 2
+        if paths[half] == ' ' and paths[2:half] == paths[half + 3:]:
+            return paths[2:half], paths[half + 3:]
+        old, _, new = paths.partition(' b/')
+        return old[2:], new
+
     @staticmethod
-    def _extract_changes(section: str) -> str:
-        """Extract the actual changes from diff section."""
-        changes = []
-        for line in section.split('\n'):
-            if line.startswith('+') and not line.startswith('+++'):
-                changes.append(f"Added: {line[1:]}")
-            elif line.startswith('-') and not line.startswith('---'):
-                changes.append(f"Removed: {line[1:]}")
-        return "\n".join(changes)
\ No newline at end of file
+    def _unquote_path(path: str) -> str:
+        """Undo the C-style quoting git applies to paths with special characters."""
+        path = path.rstrip('\t')
+        if len(path) < 2 or path[0] != '"' or path[-1] != '"':
+            return path
+
+        raw = bytearray()
+        pos, end = 1, len(path) - 1
+        while pos < end:
+            char = path[pos]
+            if char == '\\' and pos + 1 < end:
+                escaped = path[pos + 1]
+                if escaped in '01234567':
+                    # Octal escapes encode the path's raw bytes, usually UTF-8
+                    raw.append(int(path[pos + 1:pos + 4], 8))
+                    pos += 4
+                    continue
+                raw += GIT_ESCAPES.get(escaped, escaped).encode()
+                pos += 2
+                continue
+            raw += char.encode()
+            pos += 1
+        return raw.decode('utf-8', errors='replace')
+
+    @staticmethod
+    def _apply_header_line(change: FileChange, line: str):
+        """Update a FileChange from an extended header or ---/+++ line."""
+        if line.startswith('--- '):
+            path = GitHandler._unquote_path(line[4:])
+            change.old_path = None if path == '/dev/null' else path[2:]
+        elif line.startswith('+++ '):
+            path = GitHandler._unquote_path(line[4:])
+            change.new_path = None if path == '/dev/null' else path[2:]
+        elif line.startswith('new file mode'):
+            change.status = FileChange.ADDED
+        elif line.startswith('deleted file mode'):
+            change.status = FileChange.DELETED
+        elif line.startswith(('rename from ', 'copy from ')):
+            change.status = FileChange.RENAMED
+            change.old_path = GitHandler._unquote_path(line.split(' ', 2)[2])
+        elif line.startswith(('rename to ', 'copy to ')):
+            change.status = FileChange.RENAMED
+            change.new_path = GitHandler._unquote_path(line.split(' ', 2)[2])
+        elif line.startswith('new mode') and change.status == FileChange.MODIFIED:
+            change.status = FileChange.MODE
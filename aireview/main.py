@@ -1,11 +1,17 @@
 """Main module for the AI code review tool."""
 import click
 import logging
+from click.core import ParameterSource
 import asyncio
-from typing import List
-from .config import ConfigLoader
-from .git_handler import GitHandler
+import hashlib
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from .config import AIConfig, ConfigLoader, ReviewConfig
+from .git_handler import FileChange, GitHandler
 from .ai_reviewer import AIReviewer, Review
+from .planner import Planner, format_plan
 
 def setup_logging():
     """Configure logging settings."""
@@ -15,22 +21,200 @@ def setup_logging():
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
 
-def write_reviews(reviews: List[Review], output_file: str):
-    """Write reviews to output file."""
-    content = "\n\n".join(review.content for review in reviews)
+def write_reviews(reviews: List[Review], output_file: str, summary: Optional[Review] = None):
+    """Write reviews to output file, with the summary overview first if given."""
+    sections = [summary] + reviews if summary else reviews
+    content = "\n\n".join(review.content for review in sections)
     with open(output_file, "w") as f:
         f.write(content)
 
-@click.command()
+# Reviews and optional overview per prompt profile, None for the plain [prompt]
+ReviewResults = Dict[Optional[str], Tuple[List[Review], Optional[Review]]]
+
+async def run_reviews(reviewer: AIReviewer, file_changes: List[FileChange],
+                      review_config: ReviewConfig, summary: bool,
+                      repo: Optional[str] = None) -> ReviewResults:
+    """Review all changes, then optionally reduce them into an overview.
+
+    ``repo`` labels the progress output when reviewing a fleet.
+    """
+    if review_config.profiles:
+        reviews_by_profile = await reviewer.review_profiles(
+            file_changes,
+            review_config.project_context,
+            review_config.profiles,
+            review_config.prompt_encoding,
+            repo=repo
+        )
+    else:
+        reviews_by_profile = {None: await reviewer.review_changes(
+            file_changes,
+            review_config.project_context,
+            review_config.prompt_template,
+            review_config.prompt_encoding,
+            repo=repo
+        )}
+
+    async def summarize(reviews: List[Review]) -> Optional[Review]:
+        # Nothing was reviewed when every change was a rename or mode change
+        if not reviews:
+            return None
+        # The file reviews are already paid for, so a failed overview must not lose them
+        try:
+            return await reviewer.summarize_reviews(
+                reviews,
+                review_config.project_context,
+                fan_in=review_config.summary_fan_in,
+                max_depth=review_config.summary_depth,
+                repo=repo
+            )
+        except Exception as e:
+            where = f" for {repo}" if repo else ""
+            click.echo(f"Warning: overview failed{where}, writing reviews without it: {str(e)}",
+                       err=True)
+            logging.warning(f"Overview failed{where}: {str(e)}")
+            return None
+
+    overviews = [None] * len(reviews_by_profile)
+    if summary:
+        overviews = await asyncio.gather(*[
+            summarize(reviews) for reviews in reviews_by_profile.values()
+        ])
+    return {
+        profile: (reviews, overview)
+        for (profile, reviews), overview in zip(reviews_by_profile.items(), overviews)
+    }
+
+def profile_output_file(output_file: str, profile: Optional[str]) -> str:
+    """Return the output file for a prompt profile, e.g. ai-review-security.md."""
+    if profile is None:
+        return output_file
+    root, ext = os.path.splitext(output_file)
+    return f"{root}-{profile}{ext}"
+
+def write_results(results: ReviewResults, output_file: str) -> List[str]:
+    """Write the reviews of each profile to its own file and return the paths."""
+    written = []
+    for profile, (reviews, overview) in results.items():
+        path = profile_output_file(output_file, profile)
+        write_reviews(reviews, path, overview)
+        written.append(path)
+    return written
+
+def warn_ignored_settings(config_loader: ConfigLoader, review_config: ReviewConfig):
+    """Warn when [prompt.<name>] profiles replace the plain [prompt] template."""
+    if review_config.profiles and config_loader.config.has_option("prompt", "prompt_template"):
+        outputs = ", ".join(profile_output_file(review_config.output_file, profile)
+                            for profile in review_config.profiles)
+        message = ("[prompt] prompt_template is ignored because [prompt.<name>] profiles "
+                   f"are configured; reviews are written to {outputs}")
+        click.echo(f"Warning: {message}", err=True)
+        logging.warning(message)
+
+def read_repo_list(repos_file: str) -> List[str]:
+    """Read repository paths, one per line, skipping blank lines and # comments.
+
+    Relative paths are resolved against the directory of the list file.
+    """
+    base_dir = os.path.dirname(os.path.abspath(repos_file))
+    repo_paths = []
+    with open(repos_file, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                repo_paths.append(os.path.normpath(os.path.join(base_dir, line)))
+    return repo_paths
+
+def repo_output_file(repo_path: str, output_file: str) -> str:
+    """Place the review output inside the repository it belongs to.
+
+    An absolute output path is shared by every repository, so it gets a suffix
+    from the repository name and a hash of its full path.
+    """
+    if os.path.isabs(output_file):
+        root, ext = os.path.splitext(output_file)
+        digest = hashlib.sha1(os.path.abspath(repo_path).encode()).hexdigest()[:8]
+        return f"{root}-{os.path.basename(repo_path)}-{digest}{ext}"
+    return os.path.join(repo_path, output_file)
+
+async def run_fleet(reviewer: AIReviewer, repo_paths: List[str], review_config: ReviewConfig,
+                    summary: bool, git_workers: int) -> Dict[str, Optional[List[str]]]:
+    """Review several repositories concurrently with one shared reviewer.
+
+    Git extraction runs in a thread pool and each repository's reviews start
+    as soon as its changes are ready. Returns the output files written for each
+    repository, or None when it had no changes or failed.
+    """
+    loop = asyncio.get_running_loop()
+    # Progress lines are labelled with the repository name, or its path when names repeat
+    names = Counter(os.path.basename(path) for path in repo_paths)
+    labels = {
+        path: os.path.basename(path) if names[os.path.basename(path)] == 1 else path
+        for path in repo_paths
+    }
+
+    with ThreadPoolExecutor(max_workers=git_workers) as executor:
+        async def review_repository(repo_path: str) -> Optional[List[str]]:
+            try:
+                file_changes = await loop.run_in_executor(
+                    executor, GitHandler(repo_path).get_file_changes
+                )
+                if not file_changes:
+                    click.echo(f"No changes found in {repo_path}.")
+                    logging.warning(f"No changes found in {repo_path}.")
+                    return None
+
+                results = await run_reviews(reviewer, file_changes, review_config, summary,
+                                            repo=labels[repo_path])
+
+                output_files = write_results(
+                    results, repo_output_file(repo_path, review_config.output_file)
+                )
+                click.echo(f"AI review for {repo_path} written to {', '.join(output_files)}")
+                logging.info(f"AI review for {repo_path} written to {', '.join(output_files)}")
+                return output_files
+            except Exception as e:
+                click.echo(f"Error in {repo_path}: {str(e)}", err=True)
+                logging.error(f"Error in {repo_path}: {str(e)}")
+                return None
+
+        results = await asyncio.gather(*[review_repository(path) for path in repo_paths])
+
+    return dict(zip(repo_paths, results))
+
+def create_reviewer(ai_config: AIConfig) -> AIReviewer:
+    """Create the reviewer described by the AI configuration."""
+    return AIReviewer(
+        model=ai_config.model,
+        api_key=ai_config.api_key,
+        base_url=ai_config.base_url,
+        max_concurrency=ai_config.max_concurrency,
+        max_tokens_per_minute=ai_config.max_tokens_per_minute
+    )
+
+@click.group(invoke_without_command=True)
 @click.option('--config', default="aireview.config", help='Path to the configuration file.')
-def main(config: str):
+@click.option('--summary', is_flag=True, default=False,
+              help='Add a top-level overview summarizing all file reviews.')
+@click.option('--plan', is_flag=True, default=False,
+              help='Estimate requests, tokens, cost and time without calling the API.')
+@click.pass_context
+def main(ctx: click.Context, config: str, summary: bool, plan: bool):
     """AI-powered code review tool."""
+    if ctx.invoked_subcommand is not None:
+        # Hand the options to the subcommand rather than silently dropping them
+        explicit_config = ctx.get_parameter_source('config') != ParameterSource.DEFAULT
+        ctx.obj = {'config': config if explicit_config else None,
+                   'summary': summary, 'plan': plan}
+        return
+
     setup_logging()
     
     try:
         # Load configuration
         config_loader = ConfigLoader(config)
-        ai_config, review_config = config_loader.load()
+        ai_config, review_config = config_loader.load(require_api_key=not plan)
+        warn_ignored_settings(config_loader, review_config)
         
         # Get git changes
         git_handler = GitHandler()
@@ -42,28 +226,87 @@ def main(config: str):
             return
         
         # Generate reviews
-        reviewer = AIReviewer(
-            model=ai_config.model,
-            api_key=ai_config.api_key,
-            base_url=ai_config.base_url
-        )
+        reviewer = create_reviewer(ai_config)
+        
+        if plan:
+            review_plan = Planner(reviewer, ai_config).plan(
+                file_changes, review_config, summary or review_config.summary
+            )
+            click.echo(format_plan(review_plan))
+            return
         
         # Run the async review process
-        reviews = asyncio.run(reviewer.review_changes(
+        results = asyncio.run(run_reviews(
+            reviewer,
             file_changes,
-            review_config.project_context,
-            review_config.prompt_template
+            review_config,
+            summary or review_config.summary
         ))
         
         # Write output
-        write_reviews(reviews, review_config.output_file)
-        click.echo(f"AI review written to {review_config.output_file}")
-        logging.info(f"AI review written to {review_config.output_file}")
+        for output_file in write_results(results, review_config.output_file):
+            click.echo(f"AI review written to {output_file}")
+            logging.info(f"AI review written to {output_file}")
         
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
         logging.error(f"Error: {str(e)}")
         return
 
+@main.command()
+@click.argument('repos_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--config', default=None,
+              help='Path to the configuration file.  [default: aireview.config]')
+@click.option('--summary', is_flag=True, default=False,
+              help='Add a top-level overview summarizing all file reviews.')
+@click.option('--git-workers', default=4, show_default=True,
+              help='Number of repositories to extract changes from at once.')
+@click.pass_context
+def fleet(ctx: click.Context, repos_file: str, config: Optional[str], summary: bool,
+          git_workers: int):
+    """Review every repository listed in REPOS_FILE in one process.
+
+    All repositories share one API client and the max_concurrency and
+    max_tokens_per_minute limits, and each gets its own output file.
+    --config and --summary may also be given before the subcommand.
+    """
+    options = ctx.obj or {}
+    if options.get('plan'):
+        raise click.UsageError("--plan is not supported with fleet.")
+    if config and options.get('config') and config != options['config']:
+        raise click.UsageError("Conflicting --config values given before and after 'fleet'.")
+    config = config or options.get('config') or "aireview.config"
+    summary = summary or options.get('summary', False)
+
+    setup_logging()
+
+    try:
+        config_loader = ConfigLoader(config)
+        ai_config, review_config = config_loader.load()
+        warn_ignored_settings(config_loader, review_config)
+
+        repo_paths = read_repo_list(repos_file)
+        if not repo_paths:
+            click.echo(f"No repositories listed in {repos_file}.")
+            return
+
+        click.echo(f"Reviewing {len(repo_paths)} repositories...")
+        reviewer = create_reviewer(ai_config)
+        results = asyncio.run(run_fleet(
+            reviewer,
+            repo_paths,
+            review_config,
+            summary or review_config.summary,
+            max(1, git_workers)
+        ))
+
+        written = sum(1 for output_files in results.values() if output_files)
+        click.echo(f"Wrote reviews for {written} of {len(repo_paths)} repositories.")
+
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        logging.error(f"Error: {str(e)}")
+        return
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""Module for estimating the cost of a review without calling the API."""
+import math
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+from .ai_reviewer import (AIReviewer, SYSTEM_PROMPT, common_directory,
+                          create_summary_prompt, group_by_directory)
+from .config import AIConfig, ReviewConfig
+from .git_handler import FileChange
+from .tokens import EXPECTED_OUTPUT_TOKENS, get_token_counter
+
+# Assumptions used when no response is available to measure
+REQUEST_OVERHEAD_SECONDS = 2.0
+OUTPUT_TOKENS_PER_SECOND = 50.0
+# Tokens added by the chat format for each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+@dataclass
+class RequestPlan:
+    """Estimated usage of a single API request."""
+    name: str
+    input_tokens: int
+    output_tokens: int = EXPECTED_OUTPUT_TOKENS
+
+@dataclass
+class ReviewPlan:
+    """Estimated usage of a full review run."""
+    files: List[RequestPlan]
+    summaries: List[RequestPlan] = field(default_factory=list)
+    input_cost_per_million: float = 0.0
+    output_cost_per_million: float = 0.0
+    wall_time: float = 0.0
+    exact_tokens: bool = True
+
+    @property
+    def requests(self) -> List[RequestPlan]:
+        return self.files + self.summaries
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(request.input_tokens for request in self.requests)
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(request.output_tokens for request in self.requests)
+
+    @property
+    def cost(self) -> float:
+        return (self.input_tokens * self.input_cost_per_million
+                + self.output_tokens * self.output_cost_per_million) / 1_000_000
+
+class Planner:
+    """Builds every prompt a review would send and estimates its usage."""
+
+    def __init__(self, reviewer: AIReviewer, ai_config: AIConfig,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        self.reviewer = reviewer
+        self.ai_config = ai_config
+        self.exact_tokens = True
+        if count_tokens is None:
+            count_tokens, self.exact_tokens = get_token_counter(ai_config.model)
+        self.count_tokens = count_tokens
+        self._system_tokens = count_tokens(SYSTEM_PROMPT) + 2 * MESSAGE_OVERHEAD_TOKENS
+
+    def plan(self, changes: List[FileChange], review_config: ReviewConfig,
+             summary: bool = False) -> ReviewPlan:
+        """Estimate requests, tokens, cost and wall time for reviewing changes."""
+        profiles = review_config.profiles or {None: review_config.prompt_template}
+        files_by_profile = {profile: [] for profile in profiles}
+        # Renames and mode changes without hunks are not sent for review
+        for change in (change for change in changes if change.hunks):
+            for profile, template in profiles.items():
+                if profile is None:
+                    name = change.filename
+                    prompt = self.reviewer.build_prompt(
+                        change, review_config.project_context, template,
+                        review_config.prompt_encoding
+                    )
+                else:
+                    name = f"{change.filename} [{profile}]"
+                    prompt = self.reviewer.build_profile_prompt(
+                        change, review_config.project_context, template,
+                        review_config.prompt_encoding
+                    )
+                files_by_profile[profile].append(
+                    (change.filename, RequestPlan(name=name, input_tokens=self._request_tokens(prompt)))
+                )
+
+        # File reviews run in file order, every profile of a file together
+        rows = [[request for _, request in row] for row in zip(*files_by_profile.values())]
+        files = [request for row in rows for request in row]
+        levels = []
+        if summary and files:
+            # Each profile is reduced separately, with the same level running concurrently
+            profile_levels = [
+                self._plan_summaries(items, review_config, profile)
+                for profile, items in files_by_profile.items()
+            ]
+            for depth in range(max(len(summary_levels) for summary_levels in profile_levels)):
+                levels.append([
+                    request
+                    for summary_levels in profile_levels if depth < len(summary_levels)
+                    for request in summary_levels[depth]
+                ])
+
+        return ReviewPlan(
+            files=files,
+            summaries=[request for level in levels for request in level],
+            input_cost_per_million=self.ai_config.input_cost_per_million,
+            output_cost_per_million=self.ai_config.output_cost_per_million,
+            wall_time=self._files_time(rows) + sum(self._level_time(level) for level in levels),
+            exact_tokens=self.exact_tokens
+        )
+
+    def _request_tokens(self, prompt: str) -> int:
+        return self._system_tokens + self.count_tokens(prompt)
+
+    def _plan_summaries(self, items: List[Tuple[str, RequestPlan]], review_config: ReviewConfig,
+                        profile: Optional[str] = None) -> List[List[RequestPlan]]:
+        """Mirror AIReviewer.summarize_reviews to count each reduce level."""
+        fan_in = max(2, review_config.summary_fan_in)
+        suffix = f" [{profile}]" if profile else ""
+        levels = []
+
+        depth = 0
+        while len(items) > fan_in and depth < review_config.summary_depth:
+            depth += 1
+            next_items = []
+            for group in group_by_directory(items, fan_in):
+                directory = common_directory([path for path, _ in group])
+                request = self._summary_request(f"(summary) {directory or '.'}{suffix}",
+                                                group, review_config)
+                next_items.append((directory, request))
+            levels.append([request for _, request in next_items])
+            items = next_items
+
+        levels.append([self._summary_request(f"(overview){suffix}", items, review_config,
+                                             overview=True)])
+        return levels
+
+    def _summary_request(self, name: str, group: List[Tuple[str, RequestPlan]],
+                         review_config: ReviewConfig, overview: bool = False) -> RequestPlan:
+        prompt = create_summary_prompt(
+            [(path, "") for path, _ in group], review_config.project_context, overview
+        )
+        member_tokens = sum(request.output_tokens for _, request in group)
+        return RequestPlan(name=name, input_tokens=self._request_tokens(prompt) + member_tokens)
+
+    def _files_time(self, rows: List[List[RequestPlan]]) -> float:
+        """Mirror the file schedule of AIReviewer.review_profiles.
+
+        Files are admitted max_concurrency at a time; each sends its first
+        profile, then the remaining profiles together once it has completed.
+        """
+        concurrency = self.ai_config.max_concurrency
+        duration = 0.0
+        for start in range(0, len(rows), concurrency):
+            batch = rows[start:start + concurrency]
+            duration += self._level_time([row[0] for row in batch])
+            duration += self._level_time([request for row in batch for request in row[1:]])
+        return duration
+
+    def _level_time(self, level: List[RequestPlan]) -> float:
+        """Requests in a level run in waves of max_concurrency, within the token budget."""
+        if not level:
+            return 0.0
+        waves = math.ceil(len(level) / self.ai_config.max_concurrency)
+        slowest = max(request.output_tokens for request in level)
+        duration = waves * (REQUEST_OVERHEAD_SECONDS + slowest / OUTPUT_TOKENS_PER_SECOND)
+        if self.ai_config.max_tokens_per_minute:
+            tokens = sum(request.input_tokens + request.output_tokens for request in level)
+            duration = max(duration, tokens * 60 / self.ai_config.max_tokens_per_minute)
+        return duration
+
+def format_plan(plan: ReviewPlan) -> str:
+    """Format a plan as a per-request table followed by totals."""
+    width = max([len("File")] + [len(request.name) for request in plan.requests])
+    lines = [f"{'File':<{width}}  {'Input':>10}  {'Output':>10}"]
+    lines.append("-" * len(lines[0]))
+    for request in plan.requests:
+        lines.append(f"{request.name:<{width}}  {request.input_tokens:>10,}  "
+                     f"{request.output_tokens:>10,}")
+    lines.append("-" * len(lines[0]))
+    lines.append(f"{'Total':<{width}}  {plan.input_tokens:>10,}  {plan.output_tokens:>10,}")
+    lines.append("")
+
+    lines.append(f"Requests: {len(plan.requests)} "
+                 f"({len(plan.files)} files, {len(plan.summaries)} summaries)")
+    if plan.input_cost_per_million or plan.output_cost_per_million:
+        lines.append(f"Estimated cost: ${plan.cost:,.4f}")
+    else:
+        lines.append("Estimated cost: set input_cost_per_million and "
+                     "output_cost_per_million in [ai] to estimate cost")
+    lines.append(f"Estimated wall time: {plan.wall_time:,.0f}s")
+    if not plan.exact_tokens:
+        lines.append("Input tokens are approximate; install tiktoken and its encoding for exact counts.")
+    lines.append(f"Output tokens assume {EXPECTED_OUTPUT_TOKENS} per request.")
+    return "\n".join(lines)
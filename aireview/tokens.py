@@ -0,0 +1,91 @@
+"""Module for counting tokens and limiting how fast they are sent."""
+import asyncio
+import hashlib
+import math
+import os
+import tempfile
+import time
+from typing import Callable, Optional, Tuple
+
+# Assumed length of a review when no response is available to measure
+EXPECTED_OUTPUT_TOKENS = 500
+# Rough characters per token used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+# Where tiktoken downloads an encoding from; it caches the file under the URL's SHA-1
+TIKTOKEN_ENCODING_URL = "https://openaipublic.blob.core.windows.net/encodings/{}.tiktoken"
+
+def _tiktoken_encoding_is_cached(name: str) -> bool:
+    """Check whether tiktoken can load an encoding from its cache, mirroring its lookup."""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        return False
+    cache_key = hashlib.sha1(TIKTOKEN_ENCODING_URL.format(name).encode()).hexdigest()
+    return os.path.isfile(os.path.join(cache_dir, cache_key))
+
+def get_token_counter(model: str) -> Tuple[Callable[[str], int], bool]:
+    """Return a token counting function and whether its counts are exact.
+
+    Uses tiktoken when it is installed and its encoding is already cached,
+    otherwise falls back to a character based estimate. tiktoken would
+    download a missing encoding, and counting must never touch the network.
+    """
+    try:
+        import tiktoken
+        from tiktoken.model import encoding_name_for_model
+        try:
+            name = encoding_name_for_model(model)
+        except KeyError:
+            name = "cl100k_base"
+        if not _tiktoken_encoding_is_cached(name):
+            raise LookupError(f"tiktoken encoding {name} is not cached")
+        encoding = tiktoken.get_encoding(name)
+        return lambda text: len(encoding.encode(text, disallowed_special=())), True
+    except Exception:
+        return lambda text: math.ceil(len(text) / CHARS_PER_TOKEN), False
+
+class TokenRateLimiter:
+    """Token bucket that limits the tokens sent per minute.
+
+    Requests reserve their estimated tokens before they are sent, and the
+    difference from the actual usage is settled with record() afterwards.
+    """
+
+    def __init__(self, tokens_per_minute: int, clock: Callable[[], float] = time.monotonic):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.available = float(tokens_per_minute)
+        self._clock = clock
+        self._updated = clock()
+        # Created lazily so it binds to the event loop that uses it
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = self._clock()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int) -> int:
+        """Wait until the tokens fit in the budget, reserve them and return the reservation."""
+        # A single request larger than the whole budget waits for a full bucket
+        tokens = min(tokens, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # The lock keeps waiting requests in arrival order
+        async with self._lock:
+            self._refill()
+            while self.available < tokens:
+                await asyncio.sleep((tokens - self.available) / self.rate)
+                self._refill()
+            self.available -= tokens
+        return tokens
+
+    def record(self, tokens: int):
+        """Charge tokens used beyond the reservation, or refund unused ones if negative."""
+        self._refill()
+        self.available = min(self.capacity, self.available - tokens)
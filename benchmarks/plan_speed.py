@@ -0,0 +1,62 @@
+"""Time --plan on a generated repository with many staged files.
+
+    python benchmarks/plan_speed.py --files 1000 --runs 5
+
+The repository is created in a temporary directory and every file is
+staged, so the timing covers diff extraction, prompt building and token
+counting. No API key is configured and no request is made.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+from click.testing import CliRunner
+from aireview.main import main as aireview
+
+def make_repo(path: Path, files: int):
+    """Stage ``files`` small Python modules spread over 20 directories."""
+    for i in range(files):
+        directory = path / f"pkg{i % 20}"
+        directory.mkdir(exist_ok=True)
+        (directory / f"mod{i}.py").write_text(f"def f():\n    return {i}\n")
+    subprocess.run(['git', 'init', '-q'], cwd=path, check=True)
+    subprocess.run(['git', 'add', '.'], cwd=path, check=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=1000, help='Number of staged files.')
+    parser.add_argument('--runs', type=int, default=5, help='Number of timed runs.')
+    parser.add_argument('--model', default='gpt-4o', help='Model whose tokenizer is used.')
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        make_repo(path, args.files)
+        config_file = path / "aireview.config"
+        config_file.write_text(f"[ai]\nmodel = {args.model}\n")
+
+        timings = []
+        runner = CliRunner()
+        os.chdir(path)
+        with patch('aireview.ai_reviewer.AsyncOpenAI') as client:
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                result = runner.invoke(aireview, ['--config', str(config_file), '--plan'],
+                                       catch_exceptions=False)
+                timings.append(time.perf_counter() - start)
+                if result.exit_code != 0:
+                    raise SystemExit(result.output)
+        os.chdir(cwd)
+        assert not client.called, "--plan created an API client"
+
+    print(f"Files: {args.files}, runs: {args.runs}")
+    print(f"median {statistics.median(timings):.3f}s  min {min(timings):.3f}s  "
+          f"max {max(timings):.3f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compare prompt token counts of the verbose and compact encodings.
+
+Uses the history of a git repository as the corpus of diffs:
+
+    python benchmarks/prompt_encoding.py path/to/repo --commits 200
+
+"legacy" is the original format, "Added:"/"Removed:" lines without hunk
+headers. "verbose" is the same with the @@ headers that now carry line
+numbers. Install the 'plan' extra for exact tiktoken counts.
+"""
+import argparse
+import subprocess
+from aireview.ai_reviewer import AIReviewer
+from aireview.git_handler import FileChange, GitHandler
+from aireview.tokens import get_token_counter
+
+def commit_diffs(repo_path: str, commits: int):
+    """Yield the --unified=0 diff of each recent non-merge commit."""
+    shas = subprocess.run(
+        ['git', 'rev-list', '--no-merges', f'--max-count={commits}', 'HEAD'],
+        capture_output=True, text=True, check=True, cwd=repo_path
+    ).stdout.split()
+    for sha in shas:
+        yield subprocess.run(
+            ['git', 'show', '--unified=0', '--format=', sha],
+            capture_output=True, text=True, check=True, cwd=repo_path
+        ).stdout
+
+def legacy_prompt(reviewer: AIReviewer, change: FileChange) -> str:
+    """Build a prompt in the format used before hunk headers were added."""
+    changes = "\n".join(line for line in change.content.splitlines() if not line.startswith('@@'))
+    return reviewer._create_prompt(changes, change.filename, change.file_content, '', '')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('repo', help='Path to the git repository used as the corpus.')
+    parser.add_argument('--commits', type=int, default=100, help='Number of commits to read.')
+    parser.add_argument('--model', default='gpt-4o', help='Model whose tokenizer is used.')
+    args = parser.parse_args()
+
+    count_tokens, exact = get_token_counter(args.model)
+    reviewer = AIReviewer(args.model, 'benchmark')
+    totals = {'legacy': 0, 'verbose': 0, 'compact': 0}
+    files = 0
+
+    for diff in commit_diffs(args.repo, args.commits):
+        for change in GitHandler._parse_diff_output(diff):
+            files += 1
+            totals['legacy'] += count_tokens(legacy_prompt(reviewer, change))
+            for encoding in ('verbose', 'compact'):
+                totals[encoding] += count_tokens(reviewer.build_prompt(change, '', '', encoding))
+
+    print(f"Files: {files}{'' if exact else ' (approximate token counts, tiktoken unavailable)'}")
+    for encoding, tokens in totals.items():
+        print(f"{encoding:<8} {tokens:>12,} tokens")
+    if totals['legacy'] and totals['verbose']:
+        print(f"compact vs verbose: {totals['compact'] / totals['verbose'] - 1:+.1%}")
+        print(f"compact vs legacy:  {totals['compact'] / totals['legacy'] - 1:+.1%}")
+
+if __name__ == '__main__':
+    main()
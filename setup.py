@@ -86,5 +86,8 @@ setup(
             'pytest-mock>=3.10.0',
             'pytest-asyncio>=0.23.0',
         ],
+        'plan': [
+            'tiktoken>=0.7.0',
+        ],
     },
 )
\ No newline at end of file
@@ -1,7 +1,9 @@
 import pytest
 from pathlib import Path
+import subprocess
 import tempfile
 import os
+from aireview.git_handler import GitHandler
 
 @pytest.fixture
 def temp_config_file():
@@ -46,4 +48,32 @@ def temp_git_repo():
         test_file.write_text('print("hello world")\n')
         
         yield temp_dir
-        os.system(f'rm -rf {temp_dir}')
\ No newline at end of file
+        os.system(f'rm -rf {temp_dir}')
+
+@pytest.fixture
+def git():
+    """Run a git command in a repository, raising on failure."""
+    def run(repo, *args):
+        subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+    return run
+
+@pytest.fixture
+def make_change():
+    """Build a FileChange by parsing a minimal diff for a single file."""
+    def make(filename, diff_body="@@ -1 +1 @@\n-old\n+new\n", file_content=None):
+        diff = (f"diff --git a/{filename} b/{filename}\n"
+                f"--- a/{filename}\n+++ b/{filename}\n{diff_body}")
+        change = GitHandler._parse_diff_output(diff)[0]
+        change.file_content = file_content
+        return change
+    return make
+
+@pytest.fixture
+def make_repo(git):
+    """Create a git repository with one staged file."""
+    def make(path, filename, content):
+        path.mkdir()
+        git(path, 'init', '-q')
+        (path / filename).write_text(content)
+        git(path, 'add', filename)
+    return make
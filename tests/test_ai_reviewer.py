@@ -1,7 +1,9 @@
+import asyncio
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
-from aireview.ai_reviewer import AIReviewer
-from aireview.git_handler import FileChange
+from aireview.ai_reviewer import AIReviewer, Review, group_by_directory
+from aireview.git_handler import GitHandler
+from aireview.tokens import TokenRateLimiter
 
 @pytest.fixture
 def mock_openai():
@@ -20,13 +22,13 @@ def mock_openai():
         yield mock
 
 @pytest.mark.asyncio
-async def test_review_changes_with_file_content(mock_openai):
+async def test_review_changes_with_file_content(mock_openai, make_change):
     """Test AI review generation with file content."""
     reviewer = AIReviewer("test-model", "test-key")
     changes = [
-        FileChange(
-            filename="test.py",
-            content="Added: print('hello world')",
+        make_change(
+            "test.py",
+            "@@ -1,0 +2 @@\n+print('hello world')\n",
             file_content="print('hello')\nprint('hello world')"
         )
     ]
@@ -48,13 +50,13 @@ async def test_review_changes_with_file_content(mock_openai):
     assert "print('hello')" in prompt_sent
 
 @pytest.mark.asyncio
-async def test_review_changes_without_file_content(mock_openai):
+async def test_review_changes_without_file_content(mock_openai, make_change):
     """Test AI review generation without file content."""
     reviewer = AIReviewer("test-model", "test-key")
     changes = [
-        FileChange(
-            filename="test.py",
-            content="Added: print('hello world')",
+        make_change(
+            "test.py",
+            "@@ -1,0 +2 @@\n+print('hello world')\n",
             file_content=None  # No file content
         )
     ]
@@ -76,12 +78,201 @@ async def test_review_changes_without_file_content(mock_openai):
     assert changes[0].content in prompt_sent
 
 @pytest.mark.asyncio
-async def test_review_changes_api_error(mock_openai):
+async def test_review_changes_api_error(mock_openai, make_change):
     """Test handling of API errors during review."""
     mock_openai.return_value.chat.completions.create.side_effect = Exception("API Error")
     
     reviewer = AIReviewer("test-model", "test-key")
-    changes = [FileChange(filename="test.py", content="test content")]
+    changes = [make_change("test.py", "@@ -1 +1 @@\n-test\n+test content\n")]
     
     with pytest.raises(RuntimeError, match="OpenAI API error"):
-        await reviewer.review_changes(changes, "", "")
\ No newline at end of file
+        await reviewer.review_changes(changes, "", "")
+@pytest.mark.asyncio
+async def test_summarize_reviews_builds_hierarchy(mock_openai):
+    """Reviews are reduced level by level until one overview remains."""
+    reviewer = AIReviewer("test-model", "test-key")
+    reviews = [
+        Review(filename=f"pkg{i % 3}/mod{i}.py", content=f"## Review for changes in pkg{i % 3}/mod{i}.py")
+        for i in range(12)
+    ]
+
+    overview = await reviewer.summarize_reviews(reviews, "Test context", fan_in=4, max_depth=3)
+
+    assert overview.content.startswith("# Overview")
+    # 12 reviews -> 3 group summaries (one per directory) -> 1 overview
+    create = mock_openai.return_value.chat.completions.create
+    assert create.call_count == 4
+    overview_prompt = create.call_args[1]['messages'][1]['content']
+    for directory in ("pkg0", "pkg1", "pkg2"):
+        assert f"### {directory}" in overview_prompt
+
+@pytest.mark.asyncio
+async def test_summarize_reviews_respects_max_depth(mock_openai):
+    """With no reduce levels allowed, all reviews go straight into the overview."""
+    reviewer = AIReviewer("test-model", "test-key")
+    reviews = [Review(filename=f"f{i}.py", content=f"review {i}") for i in range(10)]
+
+    await reviewer.summarize_reviews(reviews, "", fan_in=2, max_depth=0)
+
+    assert mock_openai.return_value.chat.completions.create.call_count == 1
+
+def test_group_by_directory_splits_at_fan_in():
+    """Groups never exceed fan_in and small directories are not split."""
+    items = [("a/x.py", ""), ("a/y.py", ""), ("b/x.py", ""), ("b/y.py", ""), ("b/z.py", "")]
+
+    groups = group_by_directory(items, fan_in=3)
+
+    assert [[path for path, _ in group] for group in groups] == [
+        ["a/x.py", "a/y.py"],
+        ["b/x.py", "b/y.py", "b/z.py"],
+    ]
+
+@pytest.mark.asyncio
+async def test_concurrency_limit(mock_openai, make_change):
+    """No more than max_concurrency requests are in flight at once."""
+    in_flight = 0
+    peak = 0
+
+    async def slow_create(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return Mock(choices=[Mock(message=Mock(content="ok"))])
+
+    mock_openai.return_value.chat.completions.create.side_effect = slow_create
+    reviewer = AIReviewer("test-model", "test-key", max_concurrency=2)
+    changes = [make_change(f"f{i}.py", "@@ -1 +1 @@\n-a\n+b\n") for i in range(6)]
+
+    await reviewer.review_changes(changes, "", "")
+
+    assert peak == 2
+
+@pytest.mark.asyncio
+async def test_review_changes_compact_encoding(mock_openai, make_change):
+    """The compact encoding sends a unified diff without template indentation."""
+    reviewer = AIReviewer("test-model", "test-key")
+    changes = [make_change("test.py", "@@ -1 +1 @@\n-old  \n+new\n", file_content="new\n")]
+
+    await reviewer.review_changes(changes, "Test context", "Test template", encoding="compact")
+
+    prompt_sent = mock_openai.return_value.chat.completions.create.call_args[1]['messages'][1]['content']
+    assert "```diff\n@@ -1,1 +1,1 @@\n-old\n+new\n```" in prompt_sent
+    assert "Added:" not in prompt_sent
+    assert "Current file content:\n```\nnew\n```" in prompt_sent
+    assert not any(line.startswith(" ") for line in prompt_sent.splitlines())
+    assert len(prompt_sent) < len(reviewer.build_prompt(changes[0], "Test context", "Test template"))
+
+@pytest.mark.asyncio
+async def test_review_profiles(mock_openai, make_change):
+    """Every file is reviewed once per profile, sharing a prompt prefix."""
+    reviewer = AIReviewer("test-model", "test-key")
+    changes = [
+        make_change("a.py", "@@ -1 +1 @@\n-a\n+b\n", file_content="b\n"),
+        make_change("b.py", "@@ -1 +1 @@\n-c\n+d\n", file_content="d\n"),
+    ]
+    profiles = {"security": "Find vulnerabilities", "style": "Check style"}
+
+    reviews = await reviewer.review_profiles(changes, "Test context", profiles)
+
+    assert list(reviews) == ["security", "style"]
+    assert [review.filename for review in reviews["security"]] == ["a.py", "b.py"]
+    assert reviews["style"][1].content.startswith("## Review for changes in b.py")
+
+    create = mock_openai.return_value.chat.completions.create
+    assert create.call_count == 4
+    prompts = [call[1]['messages'][1]['content'] for call in create.call_args_list]
+    security, style = [prompt for prompt in prompts if "changes in a.py" in prompt]
+    assert security.endswith("Find vulnerabilities")
+    assert style.endswith("Check style")
+    assert security[:-len("Find vulnerabilities")] == style[:-len("Check style")]
+
+@pytest.mark.asyncio
+async def test_review_changes_skips_changes_without_hunks(mock_openai, make_change):
+    """Renames without content changes are not sent for review."""
+    reviewer = AIReviewer("test-model", "test-key")
+    renamed = GitHandler._parse_diff_output(
+        "diff --git a/old.py b/new.py\nsimilarity index 100%\n"
+        "rename from old.py\nrename to new.py\n"
+    )[0]
+    changes = [renamed, make_change("test.py", "@@ -1 +1 @@\n-a\n+b\n")]
+
+    reviews = await reviewer.review_changes(changes, "", "")
+
+    assert [review.filename for review in reviews] == ["test.py"]
+    assert mock_openai.return_value.chat.completions.create.call_count == 1
+
+@pytest.mark.asyncio
+async def test_token_budget_is_shared(mock_openai, monkeypatch, make_change):
+    """Every request through one reviewer draws from the same token budget."""
+    now = [0.0]
+    waits = []
+
+    async def fake_sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr('aireview.tokens.asyncio.sleep', fake_sleep)
+    monkeypatch.setattr('aireview.ai_reviewer.get_token_counter', lambda model: (len, False))
+    mock_openai.return_value.chat.completions.create.return_value.usage = None
+    reviewer = AIReviewer("test-model", "test-key", max_tokens_per_minute=1500)
+    reviewer._token_limiter = TokenRateLimiter(1500, clock=lambda: now[0])
+    changes = [make_change(f"f{i}.py", "@@ -1 +1 @@\n-a\n+b\n") for i in range(3)]
+
+    await reviewer.review_changes(changes, "", "")
+
+    # Each request reserves more than 500 tokens, so the third has to wait
+    assert mock_openai.return_value.chat.completions.create.call_count == 3
+    assert waits
+
+@pytest.mark.asyncio
+async def test_review_profiles_warms_prefix_cache_first(mock_openai, make_change):
+    """Other profiles for a file start only after its first profile has completed."""
+    events = []
+
+    async def create(**kwargs):
+        prompt = kwargs['messages'][1]['content']
+        key = (prompt.split("changes in ")[1].split(":")[0], prompt.rsplit("\n", 1)[-1])
+        events.append(("start", key))
+        await asyncio.sleep(0.01)
+        events.append(("end", key))
+        return Mock(choices=[Mock(message=Mock(content="ok"))])
+
+    mock_openai.return_value.chat.completions.create.side_effect = create
+    reviewer = AIReviewer("test-model", "test-key")
+    changes = [make_change(f"f{i}.py", "@@ -1 +1 @@\n-a\n+b\n") for i in range(2)]
+    profiles = {"security": "SEC", "style": "STY", "perf": "PERF"}
+
+    await reviewer.review_profiles(changes, "", profiles)
+
+    for filename in ("f0.py", "f1.py"):
+        first_end = events.index(("end", (filename, "SEC")))
+        for template in ("STY", "PERF"):
+            assert events.index(("start", (filename, template))) > first_end
+    # Files are not serialized behind each other
+    assert events.index(("start", ("f1.py", "SEC"))) < events.index(("end", ("f0.py", "SEC")))
+
+@pytest.mark.asyncio
+async def test_review_profiles_follow_ups_run_before_later_files(mock_openai, make_change):
+    """A file's other profiles do not queue behind the first profile of every file."""
+    started = []
+
+    async def create(**kwargs):
+        prompt = kwargs['messages'][1]['content']
+        started.append((prompt.split("changes in ")[1].split(":")[0], prompt.rsplit("\n", 1)[-1]))
+        await asyncio.sleep(0.001)
+        return Mock(choices=[Mock(message=Mock(content="ok"))])
+
+    mock_openai.return_value.chat.completions.create.side_effect = create
+    reviewer = AIReviewer("test-model", "test-key", max_concurrency=2)
+    changes = [make_change(f"f{i}.py", "@@ -1 +1 @@\n-a\n+b\n") for i in range(20)]
+
+    await reviewer.review_profiles(changes, "", {"security": "SEC", "style": "STY"})
+
+    assert len(started) == 40
+    for i in range(20):
+        follow_up = started.index((f"f{i}.py", "STY"))
+        first_requests = [key for key in started[:follow_up] if key[1] == "SEC"]
+        # Only the files holding a slot alongside this one have started
+        assert len(first_requests) <= i + 2
@@ -0,0 +1,42 @@
+import pytest
+from aireview.config import ConfigLoader
+
+def test_load_defaults(temp_config_file):
+    """Optional settings fall back to their defaults."""
+    ai_config, review_config = ConfigLoader(temp_config_file).load()
+
+    assert ai_config.max_concurrency == 10
+    assert review_config.prompt_encoding == "verbose"
+    assert review_config.summary is False
+
+def test_load_rejects_unknown_prompt_encoding(tmp_path):
+    """An unknown prompt encoding is a configuration error."""
+    config_file = tmp_path / "aireview.config"
+    config_file.write_text("[ai]\napi_key = test-key\n\n[prompt]\nencoding = tiny\n")
+
+    with pytest.raises(ValueError, match="Prompt encoding"):
+        ConfigLoader(str(config_file)).load()
+
+def test_load_prompt_profiles(tmp_path):
+    """Each [prompt.<name>] section becomes a named profile, in file order."""
+    config_file = tmp_path / "aireview.config"
+    config_file.write_text(
+        "[ai]\napi_key = test-key\n\n"
+        "[prompt.security]\nprompt_template = Look for vulnerabilities\n\n"
+        "[prompt.performance]\nprompt_template = Look for slow code\n"
+    )
+
+    _, review_config = ConfigLoader(str(config_file)).load()
+
+    assert review_config.profiles == {
+        "security": "Look for vulnerabilities",
+        "performance": "Look for slow code",
+    }
+
+def test_load_rejects_profile_without_template(tmp_path):
+    """A profile section must define its prompt template."""
+    config_file = tmp_path / "aireview.config"
+    config_file.write_text("[ai]\napi_key = test-key\n\n[prompt.style]\n")
+
+    with pytest.raises(ValueError, match="prompt_template"):
+        ConfigLoader(str(config_file)).load()
@@ -4,17 +4,22 @@ import subprocess
 from aireview.git_handler import GitHandler, FileChange
 
 def test_get_staged_changes():
-    """Test getting staged changes with file content."""
-    with patch('subprocess.run') as mock_run:
+    """Test getting staged changes with file content from the git show fallback."""
+    with patch('subprocess.run') as mock_run, \
+            patch('subprocess.Popen', side_effect=OSError("cat-file unavailable")):
         def mock_command(*args, **kwargs):
             if 'diff' in args[0]:
                 return Mock(
                     stdout="""diff --git a/test.py b/test.py
+--- a/test.py
 +++ b/test.py
+@@ -1 +1 @@
 -old line
 +new line
 diff --git a/example.js b/example.js
+--- a/example.js
 +++ b/example.js
+@@ -0,0 +1 @@
 +console.log('hello');""",
                     stderr=""
                 )
@@ -28,7 +33,7 @@ diff --git a/example.js b/example.js
         
         mock_run.side_effect = mock_command
         
-        changes = GitHandler.get_file_changes()
+        changes = GitHandler().get_file_changes()
         assert len(changes) == 2
         
         # Check first file changes
@@ -47,7 +52,7 @@ def test_get_file_changes_no_staged_changes():
     with patch('subprocess.run') as mock_run:
         mock_run.return_value = Mock(stdout="", stderr="")
         
-        changes = GitHandler.get_file_changes()
+        changes = GitHandler().get_file_changes()
         assert len(changes) == 0
 
 def test_get_file_changes_git_error():
@@ -58,17 +63,21 @@ def test_get_file_changes_git_error():
         )
         
         with pytest.raises(RuntimeError) as exc_info:
-            GitHandler.get_file_changes()
+            GitHandler().get_file_changes()
         assert "Git command failed" in str(exc_info.value)
 
 def test_get_file_changes_with_new_file():
     """Test handling of new files where git show might fail."""
-    with patch('subprocess.run') as mock_run:
+    with patch('subprocess.run') as mock_run, \
+            patch('subprocess.Popen', side_effect=OSError("cat-file unavailable")):
         def mock_command(*args, **kwargs):
             if 'diff' in args[0]:
                 return Mock(
                     stdout="""diff --git a/new.py b/new.py
+new file mode 100644
+--- /dev/null
 +++ b/new.py
+@@ -0,0 +1 @@
 +print('new file')""",
                     stderr=""
                 )
@@ -77,7 +86,235 @@ def test_get_file_changes_with_new_file():
         
         mock_run.side_effect = mock_command
         
-        changes = GitHandler.get_file_changes()
+        changes = GitHandler().get_file_changes()
         assert len(changes) == 1
         assert changes[0].filename == "new.py"
-        assert changes[0].file_content is None  # New file has no previous content
\ No newline at end of file
+        assert changes[0].status == FileChange.ADDED
+        assert changes[0].old_path is None
+        assert changes[0].file_content is None  # New file has no previous content
+
+def test_get_file_changes_reads_staged_content(tmp_path, git):
+    """Staged content is fetched by full path, so same-named files stay distinct."""
+    git(tmp_path, 'init', '-q')
+    for directory, body in (("a", "alpha\n"), ("b", "beta\n")):
+        (tmp_path / "src" / directory).mkdir(parents=True)
+        (tmp_path / "src" / directory / "utils.py").write_text(body)
+    (tmp_path / "with space.py").write_text("spaced\n")
+    git(tmp_path, 'add', '.')
+    # Unstaged edits must not leak into the reviewed content
+    (tmp_path / "src" / "a" / "utils.py").write_text("unstaged\n")
+
+    with patch('subprocess.run', wraps=subprocess.run) as mock_run:
+        changes = GitHandler(str(tmp_path)).get_file_changes()
+
+    contents = {change.filename: change.file_content for change in changes}
+    assert contents == {
+        "src/a/utils.py": "alpha\n",
+        "src/b/utils.py": "beta\n",
+        "with space.py": "spaced\n",
+    }
+    # One git diff, no per-file lookups
+    assert mock_run.call_count == 1
+
+def test_parse_diff_keeps_full_paths():
+    """Files with the same basename in different directories stay distinct."""
+    diff = """diff --git a/src/a/utils.py b/src/a/utils.py
+--- a/src/a/utils.py
++++ b/src/a/utils.py
+@@ -1 +1 @@
+-a
++b
+diff --git a/src/b/utils.py b/src/b/utils.py
+--- a/src/b/utils.py
++++ b/src/b/utils.py
+@@ -3 +3 @@
+-c
++d
+"""
+    changes = GitHandler._parse_diff_output(diff)
+    assert [c.filename for c in changes] == ["src/a/utils.py", "src/b/utils.py"]
+    assert "Added: b" in changes[0].content
+    assert "Added: d" in changes[1].content
+
+def test_parse_diff_hunks_reference_shared_buffer():
+    """Hunks keep their line ranges and point into the original diff text."""
+    diff = """diff --git a/test.py b/test.py
+--- a/test.py
++++ b/test.py
+@@ -1,2 +1 @@
+-one
+-two
++three
+@@ -10,0 +10,2 @@
++four
++--- five
+"""
+    change = GitHandler._parse_diff_output(diff)[0]
+    assert change.diff is diff
+    assert len(change.hunks) == 2
+
+    first, second = change.hunks
+    assert (first.old_start, first.old_lines, first.new_start, first.new_lines) == (1, 2, 1, 1)
+    assert (second.old_start, second.old_lines, second.new_start, second.new_lines) == (10, 0, 10, 2)
+    assert change.hunk_text(first) == "-one\n-two\n+three\n"
+    assert change.hunk_text(second) == "+four\n+--- five\n"
+    assert "@@ -10,0 +10,2 @@" in change.content
+
+def test_parse_diff_status():
+    """Deleted, renamed and mode changes are detected from the extended headers."""
+    diff = """diff --git a/gone.py b/gone.py
+deleted file mode 100644
+--- a/gone.py
++++ /dev/null
+@@ -1 +0,0 @@
+-bye
+diff --git a/old name.py b/new name.py
+similarity index 90%
+rename from old name.py
+rename to new name.py
+--- a/old name.py
++++ b/new name.py
+@@ -2 +2 @@
+-x
++y
+diff --git a/run.sh b/run.sh
+old mode 100644
+new mode 100755
+--- a/run.sh
++++ b/run.sh
+@@ -1 +1 @@
+-echo a
++echo b
+diff --git a/only_mode.sh b/only_mode.sh
+old mode 100644
+new mode 100755
+"""
+    deleted, renamed, mode, only_mode = GitHandler._parse_diff_output(diff)
+
+    assert deleted.status == FileChange.DELETED
+    assert deleted.new_path is None
+    assert deleted.filename == "gone.py"
+
+    assert renamed.status == FileChange.RENAMED
+    assert renamed.old_path == "old name.py"
+    assert renamed.new_path == "new name.py"
+
+    assert mode.status == FileChange.MODE
+    assert mode.filename == "run.sh"
+
+    assert only_mode.status == FileChange.MODE
+    assert only_mode.filename == "only_mode.sh"
+    assert only_mode.hunks == []
+
+def test_get_file_changes_without_content_changes(tmp_path, git):
+    """Pure renames and mode changes are reported without hunks."""
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'config', 'user.email', 'test@example.com')
+    git(tmp_path, 'config', 'user.name', 'Test')
+    (tmp_path / "mv.txt").write_text("same\n")
+    (tmp_path / "run.sh").write_text("echo hi\n")
+    git(tmp_path, 'add', '.')
+    git(tmp_path, 'commit', '-q', '-m', 'initial')
+    git(tmp_path, 'mv', 'mv.txt', 'moved.txt')
+    git(tmp_path, 'update-index', '--chmod=+x', 'run.sh')
+
+    changes = {c.filename: c for c in GitHandler(str(tmp_path)).get_file_changes()}
+
+    assert changes["moved.txt"].status == FileChange.RENAMED
+    assert changes["moved.txt"].old_path == "mv.txt"
+    assert changes["run.sh"].status == FileChange.MODE
+    assert all(change.hunks == [] for change in changes.values())
+
+def test_get_file_changes_decodes_quoted_paths(tmp_path, git):
+    """Paths git quotes with C-style escapes are decoded."""
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'config', 'core.quotepath', 'true')
+    (tmp_path / "café.py").write_text("x = 1\n")
+    (tmp_path / 'say "hi".py').write_text("y = 2\n")
+    git(tmp_path, 'add', '.')
+
+    changes = GitHandler(str(tmp_path)).get_file_changes()
+
+    contents = {change.filename: change.file_content for change in changes}
+    assert contents == {"café.py": "x = 1\n", 'say "hi".py': "y = 2\n"}
+
+def test_compact_content():
+    """Compact output keeps diff markers and indentation but trims noise."""
+    diff = """diff --git a/test.py b/test.py
+--- a/test.py
++++ b/test.py
+@@ -1 +1,6 @@
+-    old = 1   
++    new = 2  \t
++
++
++
++
++x = 3
+@@ -20,2 +25,3 @@
+-if x:
+-    call(a,  b)
++if x:
++
++    call(a, b)   
+"""
+    change = GitHandler._parse_diff_output(diff)[0]
+
+    assert change.compact_content == "\n".join([
+        "@@ -1,1 +1,6 @@",
+        "-    old = 1",
+        "+    new = 2",
+        "+ [4 blank lines]",
+        "+x = 3",
+        "@@ -20,2 +25,3 @@ whitespace-only change (-2 +3 lines)",
+    ])
+
+def test_compact_content_keeps_token_changes():
+    """Edits that join tokens or change string literals are never collapsed."""
+    diff = """diff --git a/test.py b/test.py
+--- a/test.py
++++ b/test.py
+@@ -1 +1 @@
+-print("a b")
++print("ab")
+@@ -5,2 +5 @@
+-call(a,
+-     b)
++call(a, b)
+"""
+    change = GitHandler._parse_diff_output(diff)[0]
+
+    assert "whitespace-only" not in change.compact_content
+    assert '+print("ab")' in change.compact_content
+    assert "+call(a, b)" in change.compact_content
+
+def test_compact_content_keeps_indentation_changes():
+    """Re-indented lines are never collapsed as whitespace-only."""
+    diff = """diff --git a/test.py b/test.py
+--- a/test.py
++++ b/test.py
+@@ -1,3 +1,3 @@
+ if x:
+-    call()
+-    done()
++    call()
++done()
+"""
+    change = GitHandler._parse_diff_output(diff)[0]
+
+    assert "whitespace-only" not in change.compact_content
+    assert "-    done()\n+    call()\n+done()" in change.compact_content
+
+def test_compact_content_keeps_short_blank_runs():
+    """Runs of blank lines up to the limit are kept as they are."""
+    diff = """diff --git a/test.py b/test.py
+--- a/test.py
++++ b/test.py
+@@ -0,0 +1,3 @@
++a
++
++b
+"""
+    change = GitHandler._parse_diff_output(diff)[0]
+
+    assert change.compact_content == "@@ -0,0 +1,3 @@\n+a\n+\n+b"
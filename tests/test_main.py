@@ -2,8 +2,8 @@ import pytest
 import os
 from click.testing import CliRunner
 from unittest.mock import patch, Mock, AsyncMock
-from aireview.main import main
-from aireview.git_handler import FileChange
+from aireview.main import main, read_repo_list
+from aireview.git_handler import FileChange, Hunk
 
 @pytest.fixture
 def mock_git_no_changes():
@@ -18,8 +18,9 @@ def mock_git_with_changes():
     with patch('aireview.git_handler.GitHandler.get_file_changes') as mock:
         mock.return_value = [
             FileChange(
-                filename='test.py',
-                content='test content',
+                old_path='test.py',
+                new_path='test.py',
+                hunks=[Hunk(1, 1, 1, 1, 0, 0)],
                 file_content='print("hello")\n'
             )
         ]
@@ -79,4 +80,180 @@ def test_main_cli_invalid_config():
     runner = CliRunner()
     result = runner.invoke(main, ['--config', 'nonexistent.config'])
     assert result.exit_code == 0  # Click catches the error
-    assert "Error" in result.output
\ No newline at end of file
+    assert "Error" in result.output
+
+
+def test_main_cli_with_summary(temp_config_file, mock_git_with_changes, mock_openai):
+    """Test CLI writes the overview at the top of the output file."""
+    import configparser
+    config = configparser.ConfigParser()
+    config.read(temp_config_file)
+    output_file = config.get("review", "output", fallback="review.md")
+
+    runner = CliRunner()
+    result = runner.invoke(main, ['--config', temp_config_file, '--summary'])
+
+    assert result.exit_code == 0
+    assert "Generating overview" in result.output
+    with open(output_file, 'r') as f:
+        content = f.read()
+    assert content.startswith("# Overview")
+    assert "## Review for changes in test.py" in content
+
+    if os.path.exists(output_file):
+        os.remove(output_file)
+
+def test_main_cli_plan(temp_config_file, mock_git_with_changes, mock_openai):
+    """Test --plan prints an estimate without calling the API."""
+    runner = CliRunner()
+    result = runner.invoke(main, ['--config', temp_config_file, '--plan'])
+
+    assert result.exit_code == 0
+    assert "test.py" in result.output
+    assert "Requests: 1 (1 files, 0 summaries)" in result.output
+    mock_openai.return_value.chat.completions.create.assert_not_called()
+
+def test_main_cli_fleet(tmp_path, temp_config_file, mock_openai, make_repo, git):
+    """Test fleet mode reviews each listed repository into its own output file."""
+    make_repo(tmp_path / "service-a", "app.py", "print('a')\n")
+    make_repo(tmp_path / "service-b", "app.py", "print('b')\n")
+    (tmp_path / "empty").mkdir()
+    git(tmp_path / "empty", 'init', '-q')
+
+    repos_file = tmp_path / "repos.txt"
+    repos_file.write_text("# nightly fleet\nservice-a\n\nservice-b\nempty\n")
+
+    runner = CliRunner()
+    result = runner.invoke(main, ['fleet', str(repos_file), '--config', temp_config_file])
+
+    assert result.exit_code == 0
+    assert "Reviewing 3 repositories" in result.output
+    assert "Wrote reviews for 2 of 3 repositories" in result.output
+    for name in ("service-a", "service-b"):
+        with open(tmp_path / name / "review.md") as f:
+            assert "## Review for changes in app.py" in f.read()
+    assert not (tmp_path / "empty" / "review.md").exists()
+    # Progress lines say which repository they belong to
+    assert "[service-a] Completed review for app.py" in result.output
+    assert "[service-b] Completed review for app.py" in result.output
+    # A single client is shared by every repository
+    assert mock_openai.call_count == 1
+    assert mock_openai.return_value.chat.completions.create.call_count == 2
+
+def test_read_repo_list(tmp_path):
+    """Relative paths resolve against the list file and comments are skipped."""
+    repos_file = tmp_path / "repos.txt"
+    repos_file.write_text("# comment\n\nrepo-a\n/abs/repo-b\n")
+
+    assert read_repo_list(str(repos_file)) == [str(tmp_path / "repo-a"), "/abs/repo-b"]
+
+def test_main_cli_with_profiles(tmp_path, mock_git_with_changes, mock_openai):
+    """Test each prompt profile is written to its own output file."""
+    output_file = tmp_path / "review.md"
+    config_file = tmp_path / "aireview.config"
+    config_file.write_text(
+        f"[ai]\napi_key = test-key\n\n[review]\noutput = {output_file}\n\n"
+        "[prompt.security]\nprompt_template = Find vulnerabilities\n\n"
+        "[prompt.style]\nprompt_template = Check style\n"
+    )
+
+    runner = CliRunner()
+    result = runner.invoke(main, ['--config', str(config_file)])
+
+    assert result.exit_code == 0
+    assert "Completed review for test.py (security)" in result.output
+    assert "Completed review for test.py (style)" in result.output
+    for profile in ("security", "style"):
+        profile_file = tmp_path / f"review-{profile}.md"
+        assert f"AI review written to {profile_file}" in result.output
+        assert "## Review for changes in test.py" in profile_file.read_text()
+    assert not output_file.exists()
+    assert mock_openai.return_value.chat.completions.create.call_count == 2
+
+def test_main_cli_warns_when_profiles_replace_prompt(tmp_path, mock_git_with_changes, mock_openai):
+    """A plain [prompt] template next to profiles is reported, not silently dropped."""
+    config_file = tmp_path / "aireview.config"
+    config_file.write_text(
+        f"[ai]\napi_key = test-key\n\n[review]\noutput = {tmp_path / 'review.md'}\n\n"
+        "[prompt]\nprompt_template = General review\n\n"
+        "[prompt.security]\nprompt_template = Find vulnerabilities\n"
+    )
+
+    result = CliRunner().invoke(main, ['--config', str(config_file)])
+
+    assert result.exit_code == 0
+    assert "Warning: [prompt] prompt_template is ignored" in result.output
+    assert str(tmp_path / "review-security.md") in result.output
+
+def test_main_cli_fleet_uses_group_options(tmp_path, temp_config_file, mock_openai, make_repo):
+    """Options given before 'fleet' are passed on to it."""
+    make_repo(tmp_path / "service", "app.py", "print('a')\n")
+    repos_file = tmp_path / "repos.txt"
+    repos_file.write_text("service\n")
+
+    runner = CliRunner()
+    result = runner.invoke(main, ['--config', temp_config_file, '--summary',
+                                  'fleet', str(repos_file)])
+
+    assert result.exit_code == 0, result.output
+    assert "Wrote reviews for 1 of 1 repositories" in result.output
+    assert (tmp_path / "service" / "review.md").read_text().startswith("# Overview")
+
+@pytest.mark.parametrize("args", [
+    ['--plan', 'fleet'],
+    ['--config', 'a.config', 'fleet', '--config', 'b.config'],
+])
+def test_main_cli_fleet_rejects_unsupported_group_options(tmp_path, mock_openai, args):
+    """Group options that fleet cannot honor stop the run before any request."""
+    repos_file = tmp_path / "repos.txt"
+    repos_file.write_text("service\n")
+    args = args[:args.index('fleet') + 1] + [str(repos_file)] + args[args.index('fleet') + 1:]
+
+    result = CliRunner().invoke(main, args)
+
+    assert result.exit_code == 2
+    mock_openai.assert_not_called()
+
+def test_repo_output_file_is_unique_per_repository():
+    """Absolute output paths do not collide for repositories with the same name."""
+    from aireview.main import repo_output_file
+
+    first = repo_output_file("/a/svc", "/reviews/ai-review.md")
+    second = repo_output_file("/b/svc", "/reviews/ai-review.md")
+
+    assert first != second
+    assert first.startswith("/reviews/ai-review-svc-") and first.endswith(".md")
+    assert repo_output_file("/a/svc", "ai-review.md") == "/a/svc/ai-review.md"
+
+def test_main_cli_summary_failure_keeps_reviews(tmp_path, mock_git_with_changes, mock_openai):
+    """A failed overview still writes the per-file reviews."""
+    output_file = tmp_path / "review.md"
+    config_file = tmp_path / "aireview.config"
+    config_file.write_text(f"[ai]\napi_key = test-key\n\n[review]\noutput = {output_file}\n")
+    create = mock_openai.return_value.chat.completions.create
+    create.side_effect = [
+        Mock(choices=[Mock(message=Mock(content="Test review content"))]),
+        Exception("rate limited"),
+    ]
+
+    result = CliRunner().invoke(main, ['--config', str(config_file), '--summary'])
+
+    assert result.exit_code == 0
+    assert "overview failed" in result.output
+    content = output_file.read_text()
+    assert "Test review content" in content
+    assert "# Overview" not in content
+
+def test_main_cli_summary_skipped_without_reviews(tmp_path, mock_openai):
+    """No overview is requested when every change is a rename without hunks."""
+    output_file = tmp_path / "review.md"
+    config_file = tmp_path / "aireview.config"
+    config_file.write_text(f"[ai]\napi_key = test-key\n\n[review]\noutput = {output_file}\n")
+    renamed = FileChange(old_path='old.py', new_path='new.py', status=FileChange.RENAMED)
+    with patch('aireview.git_handler.GitHandler.get_file_changes', return_value=[renamed]):
+        result = CliRunner().invoke(main, ['--config', str(config_file), '--summary'])
+
+    assert result.exit_code == 0, result.output
+    assert "Skipping new.py" in result.output
+    assert "Generating overview" not in result.output
+    mock_openai.return_value.chat.completions.create.assert_not_called()
@@ -0,0 +1,108 @@
+import subprocess
+import pytest
+from click.testing import CliRunner
+from unittest.mock import patch
+from aireview.ai_reviewer import AIReviewer
+from aireview.config import AIConfig, ReviewConfig
+from aireview.main import main
+from aireview.planner import (Planner, format_plan, EXPECTED_OUTPUT_TOKENS,
+                              OUTPUT_TOKENS_PER_SECOND, REQUEST_OVERHEAD_SECONDS)
+
+@pytest.fixture
+def reviewer():
+    with patch('aireview.ai_reviewer.AsyncOpenAI'):
+        yield AIReviewer("test-model", "test-key")
+
+def test_plan_counts_file_requests(reviewer, make_change):
+    """Every file prompt is built and counted without calling the API."""
+    ai_config = AIConfig("test-model", "test-key", max_concurrency=2,
+                         input_cost_per_million=1.0, output_cost_per_million=2.0)
+    review_config = ReviewConfig("review.md", "ctx", "template")
+    changes = [make_change(path) for path in ("a.py", "b.py", "c.py")]
+
+    plan = Planner(reviewer, ai_config, count_tokens=len).plan(changes, review_config)
+
+    assert [request.name for request in plan.files] == ["a.py", "b.py", "c.py"]
+    assert plan.summaries == []
+    prompt = reviewer.build_prompt(changes[0], "ctx", "template")
+    assert plan.files[0].input_tokens > len(prompt)
+    assert plan.output_tokens == 3 * EXPECTED_OUTPUT_TOKENS
+    assert plan.cost == pytest.approx(
+        (plan.input_tokens * 1.0 + plan.output_tokens * 2.0) / 1_000_000
+    )
+    reviewer.client.chat.completions.create.assert_not_called()
+
+def test_plan_wall_time_uses_concurrency(reviewer, make_change):
+    """Doubling the concurrency limit halves the number of request waves."""
+    review_config = ReviewConfig("review.md", "", "")
+    changes = [make_change(f"f{i}.py") for i in range(8)]
+
+    slow = Planner(reviewer, AIConfig("m", "k", max_concurrency=2), count_tokens=len)
+    fast = Planner(reviewer, AIConfig("m", "k", max_concurrency=4), count_tokens=len)
+
+    assert slow.plan(changes, review_config).wall_time == pytest.approx(
+        2 * fast.plan(changes, review_config).wall_time
+    )
+
+def test_plan_wall_time_sends_first_profile_first(reviewer, make_change):
+    """Each file waits for its first profile before sending the others."""
+    review_config = ReviewConfig("review.md", "", "", profiles={"security": "s", "style": "t"})
+    changes = [make_change("a.py")]
+
+    plan = Planner(reviewer, AIConfig("m", "k", max_concurrency=10), count_tokens=len).plan(
+        changes, review_config
+    )
+
+    request_time = REQUEST_OVERHEAD_SECONDS + EXPECTED_OUTPUT_TOKENS / OUTPUT_TOKENS_PER_SECOND
+    assert plan.wall_time == pytest.approx(2 * request_time)
+
+def test_plan_includes_summary_levels(reviewer, make_change):
+    """Summary requests mirror the reduce levels of summarize_reviews."""
+    review_config = ReviewConfig("review.md", "", "", summary_fan_in=4, summary_depth=3)
+    changes = [make_change(f"pkg{i % 3}/mod{i}.py") for i in range(12)]
+
+    plan = Planner(reviewer, AIConfig("m", "k"), count_tokens=len).plan(
+        changes, review_config, summary=True
+    )
+
+    # 12 files -> 3 directory summaries -> 1 overview
+    assert len(plan.summaries) == 4
+    assert plan.summaries[-1].name == "(overview)"
+    output = format_plan(plan)
+    assert "Requests: 16 (12 files, 4 summaries)" in output
+    assert "(summary) pkg0" in output
+
+def test_plan_counts_profile_pairs(reviewer, make_change):
+    """Each (file, profile) pair is a request, and each profile is summarized."""
+    review_config = ReviewConfig("review.md", "", "", profiles={"security": "s", "style": "t"})
+    changes = [make_change("a.py"), make_change("b.py")]
+
+    plan = Planner(reviewer, AIConfig("m", "k"), count_tokens=len).plan(
+        changes, review_config, summary=True
+    )
+
+    assert [request.name for request in plan.files] == [
+        "a.py [security]", "a.py [style]", "b.py [security]", "b.py [style]"
+    ]
+    assert [request.name for request in plan.summaries] == [
+        "(overview) [security]", "(overview) [style]"
+    ]
+
+def test_plan_cli_is_offline(tmp_path, monkeypatch):
+    """--plan on 1,000 staged files runs without an API key or any request."""
+    for i in range(1000):
+        directory = tmp_path / f"pkg{i % 20}"
+        directory.mkdir(exist_ok=True)
+        (directory / f"mod{i}.py").write_text(f"def f():\n    return {i}\n")
+    subprocess.run(['git', 'init', '-q'], cwd=tmp_path, check=True)
+    subprocess.run(['git', 'add', '.'], cwd=tmp_path, check=True)
+    config_file = tmp_path / "aireview.config"
+    config_file.write_text("[ai]\nmodel = test-model\n")
+    monkeypatch.chdir(tmp_path)
+
+    with patch('aireview.ai_reviewer.AsyncOpenAI') as mock_openai:
+        result = CliRunner().invoke(main, ['--config', str(config_file), '--plan'])
+
+    assert result.exit_code == 0, result.output
+    assert "Requests: 1000 (1000 files, 0 summaries)" in result.output
+    mock_openai.assert_not_called()
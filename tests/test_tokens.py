@@ -0,0 +1,66 @@
+import pytest
+from aireview.tokens import TokenRateLimiter, get_token_counter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Clock that only advances when the limiter sleeps."""
+    fake = FakeClock()
+
+    async def fake_sleep(seconds):
+        fake.now += seconds
+
+    monkeypatch.setattr('aireview.tokens.asyncio.sleep', fake_sleep)
+    return fake
+
+@pytest.mark.asyncio
+async def test_acquire_waits_for_refill(clock):
+    """Requests beyond the budget wait until enough tokens have refilled."""
+    limiter = TokenRateLimiter(600, clock=clock)
+
+    await limiter.acquire(600)
+    assert clock.now == 0
+    await limiter.acquire(100)
+    # 600 tokens per minute refill 10 per second
+    assert clock.now == pytest.approx(10)
+
+@pytest.mark.asyncio
+async def test_acquire_clamps_to_capacity(clock):
+    """A request larger than the budget waits for a full bucket instead of forever."""
+    limiter = TokenRateLimiter(600, clock=clock)
+
+    assert await limiter.acquire(5000) == 600
+    assert await limiter.acquire(5000) == 600
+    assert clock.now == pytest.approx(60)
+
+@pytest.mark.asyncio
+async def test_record_settles_actual_usage(clock):
+    """Usage above the reservation is charged, and unused tokens are refunded."""
+    limiter = TokenRateLimiter(600, clock=clock)
+
+    await limiter.acquire(300)
+    limiter.record(200)
+    assert limiter.available == pytest.approx(100)
+    limiter.record(-1000)
+    assert limiter.available == pytest.approx(600)
+
+def test_token_counter_never_downloads(monkeypatch, tmp_path):
+    """Without a cached encoding the estimate is used instead of downloading one."""
+    tiktoken_load = pytest.importorskip("tiktoken.load")
+
+    def download(blobpath):
+        raise AssertionError(f"downloaded {blobpath}")
+
+    monkeypatch.setattr(tiktoken_load, "read_file", download)
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+
+    count_tokens, exact = get_token_counter("gpt-4o")
+
+    assert not exact
+    assert count_tokens("x" * 10) == 3